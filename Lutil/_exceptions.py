@@ -6,7 +6,7 @@ class SpeculationFailedError(Exception):
 class NotDecoratableError(Exception):
     def __init__(self, obj):
         super().__init__(
-            f"{str(obj)} cannot be decorated by checkpoint, it may be a generator or a coroutine.")
+            f"{str(obj)} cannot be decorated by checkpoint, it may be an async generator.")
 
 
 class NotInlineCheckableError(Exception):
@@ -0,0 +1,38 @@
+import importlib
+import sys
+
+
+class _LazyModule(object):
+    # Imports the module on the first access of its attributes
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def __getattr__(self, attr):
+        module = self.__dict__["_module"]
+        if module is None:
+            module = self.__dict__["_module"] = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+
+np = _LazyModule("numpy")
+pd = _LazyModule("pandas")
+joblib = _LazyModule("joblib")
+chardet = _LazyModule("chardet")
+asyncio = _LazyModule("asyncio")
+
+
+def _is_instance(obj, module_name, class_names):
+    # An object cannot be an instance of a class whose module is not imported yet
+    module = sys.modules.get(module_name)
+    if module is None:
+        return False
+    return isinstance(obj, tuple(getattr(module, name) for name in class_names))
+
+
+def _is_pd_object(obj):
+    return _is_instance(obj, "pandas", ("DataFrame", "Series"))
+
+
+def _is_np_array(obj):
+    return _is_instance(obj, "numpy", ("ndarray",))
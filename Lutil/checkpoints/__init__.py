@@ -1 +1,12 @@
 from Lutil.checkpoints._checkpoint import checkpoint, InlineCheckpoint
+from Lutil.checkpoints._check_util import Fingerprint, enable_provenance
+from Lutil.checkpoints._stats import stats, reset_stats, log_stats_at_exit
+from Lutil.checkpoints._trace import start_trace, stop_trace
+from Lutil.checkpoints._memory import enable_memory_probe
+from Lutil.checkpoints._cache_server import serve_cache, stop_cache_server, enable_zero_copy
+from Lutil.checkpoints._store import set_shared_dir, wait_replication
+from Lutil.checkpoints._bundle import export_checkpoints, import_checkpoints
+from Lutil.checkpoints._pipeline import Pipeline
+from Lutil.checkpoints._joblib_memory import Memory
+from Lutil.checkpoints._cv import cross_validate
+from Lutil.checkpoints._files import FilePath
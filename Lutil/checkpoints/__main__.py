@@ -0,0 +1,67 @@
+import argparse
+import logging
+
+from Lutil.checkpoints._bundle import export_checkpoints, import_checkpoints
+from Lutil.checkpoints._cache_server import serve_cache, stop_cache_server
+
+
+def _parse_bytes(value):
+    units = {"K": 2 ** 10, "M": 2 ** 20, "G": 2 ** 30, "T": 2 ** 40}
+    value = value.upper().rstrip("B")
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def _parse_seconds(value):
+    units = {"S": 1, "M": 60, "H": 3600, "D": 86400}
+    value = value.upper()
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+def _read_manifest(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m Lutil.checkpoints")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Run the cache server holding hot checkpoints in memory.")
+    serve_parser.add_argument("--address", default=None, help="Path of the Unix domain socket.")
+    serve_parser.add_argument("--max-bytes", default="8G", type=_parse_bytes, help="Memory limit, e.g. 512M or 8G.")
+
+    stop_parser = subparsers.add_parser("stop", help="Stop the cache server.")
+    stop_parser.add_argument("--address", default=None, help="Path of the Unix domain socket.")
+
+    export_parser = subparsers.add_parser("export", help="Pack checkpoints into one archive.")
+    export_parser.add_argument("path", help="Path of the archive, or - for the standard output.")
+    export_parser.add_argument(
+        "--function", action="append", default=None, help="Name of the function or block, can be repeated."
+    )
+    export_parser.add_argument("--max-age", default=None, type=_parse_seconds, help="e.g. 3600, 30m, 12h or 7d.")
+    export_parser.add_argument("--manifest", default=None, help="File listing the keys of checkpoints, one per line.")
+
+    import_parser = subparsers.add_parser("import", help="Unpack the missing checkpoints from an archive.")
+    import_parser.add_argument("path", help="Path of the archive.")
+    import_parser.add_argument("--jobs", default=None, type=int, help="Number of threads.")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "serve":
+        serve_cache(args.address, args.max_bytes)
+    elif args.command == "stop":
+        stop_cache_server(args.address)
+    elif args.command == "export":
+        keys = _read_manifest(args.manifest) if args.manifest else None
+        export_checkpoints(args.path, args.function, args.max_age, keys)
+    elif args.command == "import":
+        import_checkpoints(args.path, args.jobs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tarfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from Lutil._logging import logger
+from Lutil.checkpoints import _checkpoint
+from Lutil.checkpoints._store import _publish, _read_index, _tmp_path
+
+_bundle_index_name = "index.json"
+_copy_buffer_size = 2 ** 20
+
+
+class _HashingReader(object):
+    def __init__(self, f):
+        self.f = f
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.sha256.update(data)
+        return data
+
+
+def _select(save_dir, functions, max_age, keys):
+    names = _read_index(save_dir)
+    if functions is not None:
+        functions = {i if isinstance(i, str) else i._record.name for i in functions}
+    if keys is not None:
+        keys = set(keys)
+
+    now = time.time()
+    entries = []
+    for entry in sorted(os.listdir(save_dir)):
+        key, ext = os.path.splitext(entry)
+        # Skips the index and the temporary files being written
+        if ext not in (".pkl", ".chunks"):
+            continue
+        if functions is not None and names.get(entry) not in functions:
+            continue
+        if keys is not None and key not in keys and entry not in keys:
+            continue
+        if max_age is not None and now - os.path.getmtime(os.path.join(save_dir, entry)) > max_age:
+            continue
+        entries.append(entry)
+    return entries, names
+
+
+def _list_files(save_dir, entry):
+    entry_path = os.path.join(save_dir, entry)
+    if os.path.isdir(entry_path):
+        return [f"{entry}/{name}" for name in sorted(os.listdir(entry_path))]
+    return [entry]
+
+
+def _add_file(tar, save_dir, name):
+    with open(os.path.join(save_dir, name), "rb") as f:
+        stat = os.fstat(f.fileno())
+        info = tarfile.TarInfo(name)
+        info.size = stat.st_size
+        info.mtime = stat.st_mtime
+        reader = _HashingReader(f)
+        tar.addfile(info, reader)
+    return {"name": name, "size": info.size, "sha256": reader.sha256.hexdigest()}
+
+
+def export_checkpoints(path, functions=None, max_age=None, keys=None):
+    save_dir = _checkpoint._save_dir
+    entries, names = _select(save_dir, functions, max_age, keys)
+
+    to_stdout = path == "-"
+    f = sys.stdout.buffer if to_stdout else open(path, "wb")
+    index = []
+    try:
+        # The archive is written as a stream, the index with the checksums comes last
+        with tarfile.open(fileobj=f, mode="w|") as tar:
+            for entry in entries:
+                try:
+                    mtime = os.path.getmtime(os.path.join(save_dir, entry))
+                    files = [_add_file(tar, save_dir, name) for name in _list_files(save_dir, entry)]
+                except FileNotFoundError:
+                    # Removed or recomputed while exporting, the files added are not in the index
+                    logger.warning(f"Checkpoint {entry} is skipped since it is changed during exporting.")
+                    continue
+                index.append({"entry": entry, "name": names.get(entry), "mtime": mtime, "files": files})
+
+            data = json.dumps({"entries": index}).encode("utf-8")
+            info = tarfile.TarInfo(_bundle_index_name)
+            info.size = len(data)
+            info.mtime = time.time()
+            tar.addfile(info, io.BytesIO(data))
+    finally:
+        if not to_stdout:
+            f.close()
+
+    logger.info(f"Exported {len(index)} checkpoints to {path}")
+    return len(index)
+
+
+def _extract_file(archive, member, file, dst):
+    sha256 = hashlib.sha256()
+    with open(archive, "rb") as src, open(dst, "wb") as out:
+        src.seek(member.offset_data)
+        remaining = member.size
+        while remaining:
+            data = src.read(min(remaining, _copy_buffer_size))
+            if not data:
+                break
+            sha256.update(data)
+            out.write(data)
+            remaining -= len(data)
+    return remaining == 0 and sha256.hexdigest() == file["sha256"]
+
+
+def _import_entry(archive, members, item, save_dir):
+    entry = item["entry"]
+    if os.path.basename(entry) != entry or os.path.splitext(entry)[1] not in (".pkl", ".chunks"):
+        logger.warning(f"Checkpoint {entry} is skipped since it is not a valid name.")
+        return False
+
+    dst = os.path.join(save_dir, entry)
+    tmp_path = _tmp_path(dst)
+    is_dir = entry.endswith(".chunks")
+    if is_dir:
+        os.mkdir(tmp_path)
+
+    try:
+        for file in item["files"]:
+            member = members.get(file["name"])
+            file_path = os.path.join(tmp_path, os.path.basename(file["name"])) if is_dir else tmp_path
+            if member is None or not _extract_file(archive, member, file, file_path):
+                logger.warning(f"Checkpoint {entry} is skipped since it fails the integrity check.")
+                return False
+            os.utime(file_path, (item["mtime"], item["mtime"]))
+
+        if os.path.exists(dst):
+            return False
+        os.replace(tmp_path, dst)
+    finally:
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path)
+        elif os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    _publish(dst, item["name"])
+    return True
+
+
+def import_checkpoints(path, max_workers=None):
+    save_dir = _checkpoint._save_dir
+    os.makedirs(save_dir, exist_ok=True)
+
+    with tarfile.open(path, "r:") as tar:
+        members = {member.name: member for member in tar.getmembers() if member.isfile()}
+        if _bundle_index_name not in members:
+            raise ValueError(f"{path} is not a checkpoint archive.")
+        index = json.load(tar.extractfile(members[_bundle_index_name]))
+
+    # Only the missing checkpoints are unpacked, each by a thread reading its own part of the archive
+    missing = [item for item in index["entries"] if not os.path.lexists(os.path.join(save_dir, item["entry"]))]
+    with ThreadPoolExecutor(max_workers) as pool:
+        imported = sum(pool.map(lambda item: _import_entry(path, members, item, save_dir), missing))
+
+    logger.info(f"Imported {imported} of {len(index['entries'])} checkpoints from {path}")
+    return imported
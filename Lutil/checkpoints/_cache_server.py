@@ -0,0 +1,361 @@
+import os
+import pickle
+import stat
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from Lutil._lazy import joblib
+from Lutil._logging import logger
+
+_server_address = os.environ.get("LUTIL_CACHE_SERVER") or None
+_retry_interval = 5
+_max_attached_segments = 64
+_zero_copy = False
+
+_MISS = object()
+
+
+def enable_zero_copy(enabled=True):
+    global _zero_copy
+    _zero_copy = enabled
+
+
+def _is_private(path, mode_mask):
+    st = os.stat(path)
+    return st.st_uid == os.getuid() and not st.st_mode & mode_mask
+
+
+def _get_runtime_dir(create=True):
+    # Only the current user can create or connect to the socket in this directory
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        path = os.path.join(os.environ["XDG_RUNTIME_DIR"], "Lutil")
+    else:
+        import tempfile
+
+        path = os.path.join(tempfile.gettempdir(), f"Lutil-{os.getuid()}")
+    if create:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+    elif not os.path.lexists(path):
+        return path
+    if not stat.S_ISDIR(os.lstat(path).st_mode) or not _is_private(path, 0o077):
+        raise PermissionError(f"{path} must be a directory only accessible by the current user.")
+    return path
+
+
+def _get_server_address(address=None, create=True):
+    return address or _server_address or os.path.join(_get_runtime_dir(create), "cache.sock")
+
+
+def _get_key_path(address):
+    return address + ".key"
+
+
+def _create_authkey(address):
+    key_path = _get_key_path(address)
+    tmp_path = f"{key_path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        authkey = os.urandom(32)
+        os.write(fd, authkey)
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, key_path)
+    return authkey
+
+
+def _read_authkey(address):
+    # The socket and the key must belong to the current user, or another user may be impersonating the server
+    key_path = _get_key_path(address)
+    if not _is_private(address, 0) or not _is_private(key_path, 0o077):
+        raise PermissionError(f"The cache server at {address} is not owned by the current user.")
+    with open(key_path, "rb") as f:
+        return f.read()
+
+
+def _is_supported():
+    # multiprocessing.connection only supports Unix domain sockets on POSIX,
+    # and the shared memory and the out-of-band pickle buffers need Python 3.8
+    return os.name == "posix" and sys.version_info >= (3, 8)
+
+
+class _Entry(object):
+    def __init__(self, shm, header, layout, stat):
+        self.shm = shm
+        self.header = header
+        self.layout = layout
+        self.stat = stat
+        self.nbytes = sum(length for _, length in layout)
+
+
+class _CacheServer(object):
+    def __init__(self, address, max_bytes):
+        self.address = address
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.loading = set()
+        self.lock = threading.Lock()
+        self.stopped = False
+
+    def serve_forever(self):
+        from multiprocessing import AuthenticationError
+        from multiprocessing.connection import Listener
+
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+        self.authkey = _create_authkey(self.address)
+        listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        logger.info(f"Checkpoint cache server is listening on {self.address}")
+        try:
+            while not self.stopped:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, EOFError, OSError) as e:
+                    logger.warning(f"Checkpoint cache server rejected a connection: {e!r}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+            if os.path.exists(_get_key_path(self.address)):
+                os.remove(_get_key_path(self.address))
+            with self.lock:
+                for entry in self.entries.values():
+                    entry.shm.close()
+                    entry.shm.unlink()
+                self.entries.clear()
+                self.nbytes = 0
+
+    def _handle(self, conn):
+        from multiprocessing.connection import Client
+
+        try:
+            while True:
+                op, *args = conn.recv()
+                if op == "get":
+                    conn.send(self._get(*args))
+                elif op == "warm":
+                    self._warm_in_background(*args)
+                elif op == "stats":
+                    with self.lock:
+                        conn.send({"entries": len(self.entries), "nbytes": self.nbytes, "max_bytes": self.max_bytes})
+                elif op == "shutdown":
+                    self.stopped = True
+                    conn.send(True)
+                    # Wake up the accept loop
+                    Client(self.address, family="AF_UNIX", authkey=self.authkey).close()
+                    return
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def _get(self, path, stat):
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None or entry.stat != stat:
+                return None
+            self.entries.move_to_end(path)
+            return entry.shm.name, entry.header, entry.layout
+
+    def _warm_in_background(self, path, stat):
+        with self.lock:
+            if path in self.loading or (path in self.entries and self.entries[path].stat == stat):
+                return
+            self.loading.add(path)
+        threading.Thread(target=self._warm, args=(path, stat), daemon=True).start()
+
+    def _warm(self, path, stat):
+        from multiprocessing import shared_memory
+
+        try:
+            # Only the checkpoints of the user running the server are loaded
+            if os.stat(path).st_uid != os.getuid():
+                raise PermissionError(f"{path} is not owned by the current user.")
+            obj = joblib.load(path)
+            current = os.stat(path)
+            if (current.st_mtime_ns, current.st_size) != stat:
+                return
+
+            buffers = []
+            header = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+            raws = [buffer.raw() for buffer in buffers]
+
+            layout = []
+            offset = 0
+            for raw in raws:
+                layout.append((offset, raw.nbytes))
+                offset += raw.nbytes
+
+            if offset > self.max_bytes:
+                return
+
+            shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+            for raw, (offset, length) in zip(raws, layout):
+                shm.buf[offset : offset + length] = raw
+
+            with self.lock:
+                old = self.entries.pop(path, None)
+                if old is not None:
+                    self._drop(old)
+                self.entries[path] = _Entry(shm, header, layout, stat)
+                self.nbytes += self.entries[path].nbytes
+                while self.nbytes > self.max_bytes:
+                    _, evicted = self.entries.popitem(last=False)
+                    self._drop(evicted)
+        except Exception as e:
+            logger.warning(f"Checkpoint cache server failed to load {path}: {e!r}")
+        finally:
+            with self.lock:
+                self.loading.discard(path)
+
+    def _drop(self, entry):
+        # Clients which have attached the segment keep their mapping until they close it
+        self.nbytes -= entry.nbytes
+        entry.shm.close()
+        entry.shm.unlink()
+
+
+def serve_cache(address=None, max_bytes=8 * 2 ** 30):
+    if not _is_supported():  # pragma: no cover
+        raise OSError("The checkpoint cache server requires Python 3.8 or later and Unix domain sockets.")
+    _CacheServer(_get_server_address(address), max_bytes).serve_forever()
+
+
+def stop_cache_server(address=None):
+    from multiprocessing.connection import Client
+
+    address = _get_server_address(address, create=False)
+    conn = Client(address, family="AF_UNIX", authkey=_read_authkey(address))
+    try:
+        conn.send(("shutdown",))
+        conn.recv()
+    finally:
+        conn.close()
+
+
+def _attach_segment(name):
+    from multiprocessing import resource_tracker, shared_memory
+
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13, the resource tracker would unlink the segment when this process exits
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class _CacheClient(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.conn = None
+        self.pid = None
+        self.retry_at = 0
+        self.hits = 0
+        self.segments = OrderedDict()
+
+    def _connect(self):
+        if self.conn is not None and self.pid == os.getpid():
+            return self.conn
+
+        # A connection inherited from the parent process cannot be shared
+        self.conn = None
+        if time.monotonic() < self.retry_at or not _is_supported():
+            return None
+
+        # The connection machinery is only imported when a server may be running
+        from multiprocessing import AuthenticationError
+        from multiprocessing.connection import Client
+
+        try:
+            address = _get_server_address(create=False)
+            if not os.path.exists(address):
+                return None
+            self.conn = Client(address, family="AF_UNIX", authkey=_read_authkey(address))
+            self.pid = os.getpid()
+        except (AuthenticationError, EOFError, OSError) as e:
+            if isinstance(e, (AuthenticationError, PermissionError)):
+                logger.warning(f"Failed to connect to the checkpoint cache server: {e!r}")
+            self.retry_at = time.monotonic() + _retry_interval
+        return self.conn
+
+    def _request(self, msg, reply=True):
+        with self.lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                conn.send(msg)
+                return conn.recv() if reply else None
+            except (OSError, EOFError):
+                self.conn = None
+                self.retry_at = time.monotonic() + _retry_interval
+                return None
+
+    def _attach(self, name):
+        if name in self.segments:
+            self.segments.move_to_end(name)
+            return self.segments[name]
+
+        shm = _attach_segment(name)
+        self.segments[name] = shm
+        if len(self.segments) > _max_attached_segments:
+            for old_name in list(self.segments)[:-_max_attached_segments]:
+                try:
+                    self.segments[old_name].close()
+                    del self.segments[old_name]
+                except BufferError:
+                    # Some loaded objects are still using this segment
+                    pass
+        return shm
+
+    def _key(self, cache_path):
+        stat = os.stat(cache_path)
+        return os.path.abspath(cache_path), (stat.st_mtime_ns, stat.st_size)
+
+    def load(self, cache_path):
+        if self._request_available() is None:
+            return _MISS
+
+        path, stat = self._key(cache_path)
+        res = self._request(("get", path, stat))
+        if res is None:
+            return _MISS
+
+        name, header, layout = res
+        try:
+            with self.lock:
+                shm = self._attach(name)
+        except FileNotFoundError:
+            return _MISS
+
+        if _zero_copy:
+            # The buffers are read-only, since they are shared with other processes
+            buffers = [shm.buf[offset : offset + length].toreadonly() for offset, length in layout]
+        else:
+            buffers = [bytearray(shm.buf[offset : offset + length]) for offset, length in layout]
+        res = pickle.loads(header, buffers=buffers)
+        self.hits += 1
+        return res
+
+    def warm(self, cache_path):
+        if self._request_available() is None:
+            return
+        path, stat = self._key(cache_path)
+        self._request(("warm", path, stat), reply=False)
+
+    def stats(self):
+        return self._request(("stats",))
+
+    def _request_available(self):
+        with self.lock:
+            return self._connect()
+
+
+_cache_client = _CacheClient()
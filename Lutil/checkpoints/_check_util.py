@@ -2,14 +2,15 @@ import hashlib
 import inspect
 import os
 import re
+import weakref
 from collections import OrderedDict
 
-import numpy as np
-import pandas as pd
 import warnings
 
+from Lutil._lazy import np, pd, _is_pd_object, _is_np_array
 from Lutil._exceptions import NotDecoratableError, ComplexParamsIdentifyWarning, NotInlineCheckableError
 from Lutil._logging import logger
+from Lutil.checkpoints._files import FilePath, _get_file_hash
 
 
 def _get_file_info(obj):
@@ -38,9 +39,9 @@ def _get_identify_str_for_cls_or_object(obj):
                 or inspect.isbuiltin(value)
             ):
                 pass
-            elif isinstance(value, (pd.DataFrame, pd.Series)):
+            elif _is_pd_object(value):
                 identify_dict[attr] = _hash_pd_object(value)
-            elif isinstance(value, np.ndarray):
+            elif _is_np_array(value):
                 identify_dict[attr] = _hash_np_array(value)
             else:
                 str_val = str(value)
@@ -52,26 +53,251 @@ def _get_identify_str_for_cls_or_object(obj):
     return "-".join([k + ":" + v for k, v in identify_dict.items()])
 
 
-def _hash_pd_object(obj):
+class _IdentityTable(object):
+    # Maps objects to values by identity, since pd.DataFrame and np.ndarray are not hashable.
+    # The entry is dropped once the object is garbage collected.
+    def __init__(self):
+        self._table = {}
+
+    def __setitem__(self, obj, value):
+        key = id(obj)
+        ref = weakref.ref(obj, lambda _: self._table.pop(key, None))
+        self._table[key] = (ref, value)
+
+    def get(self, obj, default=None):
+        entry = self._table.get(id(obj))
+        if entry is None or entry[0]() is not obj:
+            return default
+        return entry[1]
+
+    def pop(self, obj, default=None):
+        value = self.get(obj, default)
+        self._table.pop(id(obj), None)
+        return value
+
+
+_block_size = 65536
+_attached_fingerprints = _IdentityTable()
+
+
+def _as_pd_object(obj):
+    if _is_pd_object(obj):
+        return obj
+    elif _is_np_array(obj):
+        return pd.DataFrame(obj)
+    else:
+        raise TypeError(f"Fingerprint only supports pd.DataFrame, pd.Series or np.ndarray, rather than {type(obj)}.")
+
+
+def _hash_rows(obj):
     try:
-        return hashlib.md5(pd.util.hash_pandas_object(obj, index=True).values).hexdigest()
+        return pd.util.hash_pandas_object(obj, index=True).values
     except TypeError:
-        return hashlib.md5(
-            pd.util.hash_pandas_object(obj.applymap(_get_identify_str_for_value), index=True).values
-        ).hexdigest()
+        return pd.util.hash_pandas_object(obj.applymap(_get_identify_str_for_value), index=True).values
+
+
+class Fingerprint(object):
+    def __init__(self, obj):
+        frame = _as_pd_object(obj)
+        self.length = len(frame)
+        self.guard = None
+        rows = _hash_rows(frame)
+        self.blocks = [
+            hashlib.md5(rows[start : start + _block_size]).hexdigest()
+            for start in range(0, max(self.length, 1), _block_size)
+        ]
+
+    @property
+    def root(self):
+        # A single block gives the same value as hashing the whole object
+        if len(self.blocks) == 1:
+            return self.blocks[0]
+        return _get_hash_of_str("".join(self.blocks))
+
+    def update(self, obj, rows=None):
+        frame = _as_pd_object(obj)
+        length = len(frame)
+        n_blocks = max((length + _block_size - 1) // _block_size, 1)
+
+        # Without the changed rows, every block is hashed again
+        touched = set(range(n_blocks)) if rows is None else {row // _block_size for row in rows}
+        if length != self.length:
+            touched.update(range(min(length, self.length) // _block_size, n_blocks))
+
+        self.blocks = self.blocks[:n_blocks] + [None] * (n_blocks - len(self.blocks))
+        for ix in sorted(touched):
+            if ix < n_blocks:
+                block = frame.iloc[ix * _block_size : (ix + 1) * _block_size]
+                self.blocks[ix] = hashlib.md5(_hash_rows(block)).hexdigest()
+
+        self.length = length
+        if self.guard is not None:
+            self.guard = _get_guard(obj)
+        return self
+
+    def diff(self, other):
+        length = max(self.length, other.length)
+        ranges = []
+        for ix in range(max(len(self.blocks), len(other.blocks))):
+            mine = self.blocks[ix] if ix < len(self.blocks) else None
+            theirs = other.blocks[ix] if ix < len(other.blocks) else None
+            if mine != theirs:
+                start, stop = ix * _block_size, min((ix + 1) * _block_size, length)
+                if ranges and ranges[-1][1] == start:
+                    ranges[-1] = (ranges[-1][0], stop)
+                else:
+                    ranges.append((start, stop))
+        return ranges
+
+    def attach(self, obj):
+        if len(obj) != self.length:
+            raise ValueError("The fingerprint does not match the length of the object.")
+        self.guard = _get_guard(obj)
+        _attached_fingerprints[obj] = self
+        return self
+
+    @staticmethod
+    def of(obj):
+        fingerprint = _attached_fingerprints.get(obj)
+        # The object may be modified without updating the attached fingerprint
+        if fingerprint is None or fingerprint.length != len(obj) or fingerprint.guard != _get_guard(obj):
+            fingerprint = Fingerprint(obj)
+        return fingerprint
+
+
+_provenance = _IdentityTable()
+_provenance_enabled = False
+_n_guard_rows = 64
+
+
+def enable_provenance(enabled=True):
+    global _provenance_enabled
+    _provenance_enabled = enabled
+
+
+def _get_arrays(obj):
+    if _is_np_array(obj):
+        return [obj]
+    try:
+        return list(obj._mgr.arrays)
+    except AttributeError:
+        return None
+
+
+def _freeze(obj):
+    # Extension arrays cannot be read-only
+    arrays = _get_arrays(obj)
+    if not arrays or not all(_is_np_array(arr) for arr in arrays):
+        return False
+    for arr in arrays:
+        # The blocks of a frame are usually views, which could still be modified through their bases
+        while _is_np_array(arr):
+            arr.flags.writeable = False
+            arr = arr.base
+    return True
+
+
+def _is_frozen(obj):
+    # A frame copies its data into new writable arrays in some operations, e.g. consolidating the blocks
+    arrays = _get_arrays(obj)
+    return bool(arrays) and not any(arr.flags.writeable for arr in arrays)
+
+
+def _get_guard(obj):
+    # A cheap check of mutation: the shape, the dtypes, the columns and the hash of sampled rows
+    frame = _as_pd_object(obj)
+    rows = np.linspace(0, len(frame) - 1, num=min(len(frame), _n_guard_rows), dtype=int)
+    sample = hashlib.md5(_hash_rows(frame.iloc[rows])).hexdigest()
+    dtypes = frame.dtypes.astype(str).tolist() if isinstance(frame, pd.DataFrame) else str(frame.dtype)
+    columns = frame.columns.tolist() if isinstance(frame, pd.DataFrame) else frame.name
+    return (type(obj), obj.shape, dtypes, str(columns), sample)
+
+
+def _iter_source_arrays(sources, obj):
+    for source in sources:
+        if isinstance(source, (list, tuple)):
+            candidates = source
+        else:
+            candidates = [source, *getattr(source, "__dict__", {}).values()]
+        for candidate in candidates:
+            if candidate is not obj and (_is_pd_object(candidate) or _is_np_array(candidate)):
+                yield from (arr for arr in _get_arrays(candidate) or [] if _is_np_array(arr))
+
+
+def _shares_memory(obj, sources):
+    arrays = [arr for arr in _get_arrays(obj) or [] if _is_np_array(arr)]
+    if not arrays:
+        return False
+    return any(np.may_share_memory(arr, other) for other in _iter_source_arrays(sources, obj) for arr in arrays)
+
+
+def _tag_provenance(obj, key, sources=()):
+    if not _provenance_enabled or not (_is_pd_object(obj) or _is_np_array(obj)):
+        return
+    # Freezing a view of an input would make the input read-only as well
+    if _shares_memory(obj, sources):
+        return
+    try:
+        guard = _get_guard(obj)
+    except (TypeError, ValueError):
+        return
+    # The data is made read-only, so that modifying it in place cannot keep the key
+    if _freeze(obj):
+        _provenance[obj] = (key, guard)
+
+
+def _get_provenance(obj):
+    if not _provenance_enabled:
+        return None
+    entry = _provenance.get(obj)
+    if entry is None:
+        return None
+
+    key, guard = entry
+    if not _is_frozen(obj) or _get_guard(obj) != guard:
+        _provenance.pop(obj)
+        return None
+    return key
+
+
+def _hash_pd_object(obj):
+    # The result of a checkpoint is identified by its key, rather than hashing it again
+    key = _get_provenance(obj)
+    if key is not None:
+        return f"checkpoint-{key}"
+    return Fingerprint.of(obj).root
 
 
 def _hash_np_array(arr):
-    return "numpy" + str(type(arr)) + _hash_pd_object(pd.DataFrame(arr))
+    key = _get_provenance(arr)
+    if key is not None:
+        return f"checkpoint-{key}"
+    return "numpy" + str(type(arr)) + Fingerprint.of(arr).root
+
+
+def _get_identify_str_for_estimator(estimator):
+    # The repr of an estimator may be truncated, and it does not include the fitted attributes
+    identify_dict = {k: _get_identify_str_for_value(v) for k, v in sorted(estimator.get_params(deep=False).items())}
+    for attr, value in sorted(getattr(estimator, "__dict__", {}).items()):
+        if attr.endswith("_") and not attr.startswith("_"):
+            identify_dict[attr] = _get_identify_str_for_value(value)
+    identify_str = "-".join([k + ":" + v for k, v in identify_dict.items()])
+    return f"{type(estimator).__qualname__}({identify_str})"
 
 
 def _get_identify_str_for_value(value):
-    if isinstance(value, (pd.DataFrame, pd.Series)):
+    if isinstance(value, FilePath):
+        return f"file:{_get_file_hash(value)}"
+
+    elif _is_pd_object(value):
         return _hash_pd_object(value)
 
-    elif isinstance(value, np.ndarray):
+    elif _is_np_array(value):
         return _hash_np_array(value)
 
+    elif hasattr(value, "get_params") and not inspect.isclass(value):
+        return _get_identify_str_for_estimator(value)
+
     else:
         str_val = str(value)
         if re.compile(r"<.*? object at \w{12,20}>").match(str_val):
@@ -92,7 +318,7 @@ def _is_general_handleable(obj):
 
 
 def _check_handleable(obj):
-    if not _is_general_handleable(obj):
+    if not (_is_general_handleable(obj) or inspect.isgeneratorfunction(obj) or inspect.iscoroutinefunction(obj)):
         raise NotDecoratableError(obj)
 
 
@@ -101,6 +327,12 @@ def _check_inline_handleable(obj):
         raise NotInlineCheckableError(obj)
 
 
+def _unwrap_func(func):
+    if inspect.ismethod(func):
+        func = func.__func__
+    return inspect.unwrap(func)
+
+
 def _get_identify_str_for_func(func, applied_args, ignore=[]):
     qualname = func.__qualname__
 
@@ -116,7 +348,7 @@ def _get_identify_str_for_func(func, applied_args, ignore=[]):
             warnings.warn(ComplexParamsIdentifyWarning(f"A class is used as the parameter"))
             identify_args[key] = value.__qualname__
 
-        elif inspect.ismethod(value) or inspect.isfunction(value):
+        elif inspect.ismethod(value) or inspect.isfunction(_unwrap_func(value)):
             warnings.warn(ComplexParamsIdentifyWarning(f"A function is used as the parameter"))
             tmp_applied_args = _get_applied_args(value, (), {})
             identify_args[key] = _get_identify_str_for_func(value, tmp_applied_args)
@@ -126,7 +358,7 @@ def _get_identify_str_for_func(func, applied_args, ignore=[]):
 
     identify_args_str = "-".join([f"{k}:{v}" for k, v in identify_args.items()])
 
-    code = inspect.getsource(func).replace("\n", "").replace(" ", "")
+    code = inspect.getsource(_unwrap_func(func)).replace("\n", "").replace(" ", "")
 
     full_str = f"{qualname}-{identify_args_str}-{code}"
     logger.debug(f"Identification String: {full_str}")
@@ -151,4 +383,9 @@ def _get_applied_args(func, args, kwargs):
     for key, value in kwargs.items():
         applied_args[key] = value
 
+    # *args and **kwargs left empty have no value to identify
+    for key, param in signature.parameters.items():
+        if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD) and applied_args.get(key) is param.empty:
+            del applied_args[key]
+
     return applied_args
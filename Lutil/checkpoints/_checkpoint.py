@@ -1,8 +1,19 @@
+import functools
+import importlib
 import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+import concurrent.futures
+import copy
+from concurrent.futures import ThreadPoolExecutor
 
-import joblib
 import re
 
+from Lutil._lazy import np, pd, asyncio, _is_pd_object, _is_np_array
 from Lutil.checkpoints._check_util import (
     _get_applied_args,
     _get_hash_of_str,
@@ -11,9 +22,22 @@ from Lutil.checkpoints._check_util import (
     _get_identify_str_for_value,
     _check_handleable,
     _check_inline_handleable,
+    _is_general_handleable,
+    _tag_provenance,
 )
-
-from Lutil._exceptions import SkipWithBlock, InlineEnvironmentWarning
+from Lutil.checkpoints._files import _get_identify_str_for_files
+
+from Lutil.checkpoints._store import _dump, _load, _exists, _publish
+from Lutil.checkpoints._stats import (
+    _get_record,
+    _measure,
+    _add,
+    _count_hit,
+    _count_miss,
+    _start_memory_probe,
+    _finish_memory_probe,
+)
+from Lutil._exceptions import SkipWithBlock, InlineEnvironmentWarning, NotDecoratableError
 import sys
 import inspect
 from Lutil._logging import logger
@@ -21,9 +45,514 @@ import warnings
 
 
 _save_dir = ".Lutil-checkpoint"
+_end_of_chunks = object()
+_n_chunk_retries = 20
+_chunk_retry_interval = 0.05
+_refresh_executor = None
+_refresh_executor_lock = threading.Lock()
+
+
+def _ensure_save_dir():
+    if not os.path.exists(_save_dir):
+        os.mkdir(_save_dir)
+
+
+def _get_cache_path(func, args, kwargs, ignore, watch_files=()):
+    _check_handleable(func)
+    file_info = _get_file_info(func)
+
+    applied_args = _get_applied_args(func, args, kwargs)
+    id_str = _get_identify_str_for_func(func, applied_args, ignore)
+    if watch_files:
+        id_str += _get_identify_str_for_files(watch_files)
+    hash_val = _get_hash_of_str(file_info + id_str)
+
+    return os.path.join(_save_dir, f"{hash_val}.pkl")
 
 
-def checkpoint(ignore=[]):
+def _get_key(cache_path):
+    return os.path.splitext(os.path.basename(cache_path))[0]
+
+
+def _pop_recompute(kwargs):
+    return bool(kwargs.pop("__recompute__", False))
+
+
+def _get_executor(executor, max_workers):
+    if executor == "thread":
+        return ThreadPoolExecutor(max_workers=max_workers)
+    elif executor == "process":
+        # concurrent.futures imports the process pool and multiprocessing on the first access
+        return concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+    else:
+        raise ValueError(f"Unsupported executor '{executor}', should be either 'thread' or 'process'.")
+
+
+def _load_by_reference(module, qualname):
+    obj = importlib.import_module(module)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def _get_refresh_executor():
+    global _refresh_executor
+    with _refresh_executor_lock:
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(thread_name_prefix="Lutil-refresh")
+        return _refresh_executor
+
+
+def _update_mean(mean, n, value):
+    return value if n == 0 else mean + (value - mean) / (n + 1)
+
+
+class _AdaptiveAdmission(object):
+    def __init__(self, min_samples=3):
+        self.min_samples = min_samples
+        self.n_computes = self.n_dumps = self.n_loads = 0
+        self.compute_time = self.dump_time = self.load_time = self.size = None
+        self.admit = True
+        self._lock = threading.Lock()
+
+    def record_compute(self, seconds):
+        with self._lock:
+            self.compute_time = _update_mean(self.compute_time, self.n_computes, seconds)
+            self.n_computes += 1
+            self._decide()
+
+    def record_dump(self, seconds, size):
+        with self._lock:
+            self.dump_time = _update_mean(self.dump_time, self.n_dumps, seconds)
+            self.size = _update_mean(self.size, self.n_dumps, size)
+            self.n_dumps += 1
+            self._decide()
+
+    def record_load(self, seconds):
+        with self._lock:
+            self.load_time = _update_mean(self.load_time, self.n_loads, seconds)
+            self.n_loads += 1
+            self._decide()
+
+    def _decide(self):
+        # Before any load is observed, the dump time is used as an estimation of the load time
+        load_time = self.load_time if self.n_loads else self.dump_time
+        if self.n_computes < self.min_samples or load_time is None:
+            admit = True
+        else:
+            admit = load_time < self.compute_time
+
+        if admit != self.admit:
+            logger.info(
+                f"{'Start' if admit else 'Stop'} caching: "
+                f"load time {load_time:.4f}s, compute time {self.compute_time:.4f}s"
+            )
+        self.admit = admit
+
+
+def _is_from_args(res, args, kwargs):
+    # An argument, or an attribute of it, returned as it is keeps being identified by its content
+    for i in (*args, *kwargs.values()):
+        if res is i or any(res is j for j in getattr(i, "__dict__", {}).values()):
+            return True
+    return False
+
+
+class _BoundCheckpoint(object):
+    # A checkpoint method bound to an object, which is also passed to the calls of map and starmap
+    def __init__(self, func, obj):
+        self.__func__ = func
+        self.__self__ = obj
+
+    def __getattr__(self, name):
+        return getattr(self.__func__, name)
+
+    def __reduce__(self):
+        return (getattr, (self.__self__, self.__func__.__name__))
+
+    def __call__(self, *args, **kwargs):
+        return self.__func__(self.__self__, *args, **kwargs)
+
+    def map(self, iterable, executor="thread", max_workers=None):
+        return self.__func__._batch_call([(self.__self__, i) for i in iterable], executor, max_workers)
+
+    def starmap(self, iterable, executor="thread", max_workers=None):
+        return self.__func__._batch_call([(self.__self__, *i) for i in iterable], executor, max_workers)
+
+
+class _CheckpointFunction(object):
+    def __init__(
+        self, func, ignore, refresh=None, max_staleness=None, admission="always", watch_files=(), refresh_after=60
+    ):
+        functools.update_wrapper(self, func)
+        self._func = func
+        self._ignore = ignore
+        self._watch_files = list(watch_files)
+        self._refresh = refresh
+        self._refresh_after = refresh_after
+        self._max_staleness = max_staleness
+        self.admission = _AdaptiveAdmission() if admission == "adaptive" else None
+        self._record = _get_record(f"{func.__module__}.{func.__qualname__}")
+        self._record.admission = self.admission
+        self._refreshing = {}
+        self._refreshing_lock = threading.Lock()
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return _BoundCheckpoint(self, obj)
+
+    def __reduce__(self):
+        if "<locals>" in self.__qualname__:
+            raise pickle.PicklingError(
+                f"Can't pickle {self.__qualname__}: a function decorated by checkpoint must be defined at module level."
+            )
+        return (_load_by_reference, (self.__module__, self.__qualname__))
+
+    def _prepare_call(self, args, kwargs):
+        _ensure_save_dir()
+        recompute = _pop_recompute(kwargs)
+        with _measure(self._record, "fingerprint") as span:
+            cache_path = self._get_cache_path(args, kwargs)
+            span.key = _get_key(cache_path)
+        return cache_path, recompute
+
+    def _get_cache_path(self, args, kwargs):
+        return _get_cache_path(self._func, args, kwargs, self._ignore, self._watch_files)
+
+    def __call__(self, *args, **kwargs):
+        cache_path, recompute = self._prepare_call(args, kwargs)
+
+        if _exists(cache_path) and not recompute and not self._is_too_stale(cache_path):
+            res = self._load(cache_path)
+            if self._refresh == "background":
+                self._refresh_in_background(args, kwargs, cache_path)
+            return res
+        else:
+            return self._compute_and_dump(args, kwargs, cache_path)
+
+    def _is_too_stale(self, cache_path):
+        if self._max_staleness is None:
+            return False
+        return time.time() - os.path.getmtime(cache_path) > self._max_staleness
+
+    def _refresh_in_background(self, args, kwargs, cache_path):
+        if time.time() - os.path.getmtime(cache_path) < self._refresh_after:
+            return
+
+        with self._refreshing_lock:
+            if cache_path in self._refreshing:
+                return
+            try:
+                # The caller may modify the arguments after the call, which would not match the key any more
+                args, kwargs = copy.deepcopy((args, kwargs))
+            except Exception as e:
+                logger.warning(f"Background refresh of {self.__qualname__} is skipped, failed to copy the arguments: {e!r}")
+                return
+            future = _get_refresh_executor().submit(self._compute_and_dump, args, kwargs, cache_path)
+            self._refreshing[cache_path] = future
+        future.add_done_callback(lambda f: self._finish_refresh(cache_path, f))
+
+    def _finish_refresh(self, cache_path, future):
+        with self._refreshing_lock:
+            self._refreshing.pop(cache_path, None)
+        if future.exception() is not None:
+            logger.warning(f"Background refresh of {self.__qualname__} failed: {future.exception()!r}")
+
+    def wait_refresh(self, timeout=None):
+        with self._refreshing_lock:
+            futures = list(self._refreshing.values())
+        concurrent.futures.wait(futures, timeout=timeout)
+
+    def _load(self, cache_path):
+        with _measure(self._record, "load", _get_key(cache_path)) as span:
+            res = _load(cache_path)
+            span.size = os.path.getsize(cache_path)
+
+        _count_hit(self._record, span.elapsed)
+        if self.admission is not None:
+            self.admission.record_load(span.elapsed)
+        _tag_provenance(res, _get_key(cache_path))
+        return res
+
+    def _compute_and_dump(self, args, kwargs, cache_path):
+        _count_miss(self._record)
+        with _measure(self._record, "compute", _get_key(cache_path)) as span:
+            res = self._func(*args, **kwargs)
+
+        if self.admission is not None:
+            self.admission.record_compute(span.elapsed)
+        self._dump_result(res, cache_path)
+        if not _is_from_args(res, args, kwargs):
+            _tag_provenance(res, _get_key(cache_path), (*args, *kwargs.values()))
+        return res
+
+    def _dump_result(self, res, cache_path):
+        if self.admission is not None and not self.admission.admit:
+            return
+
+        with _measure(self._record, "dump", _get_key(cache_path)) as span:
+            _dump(res, cache_path)
+            span.size = os.path.getsize(cache_path)
+        _publish(cache_path, self._record.name)
+
+        if self.admission is not None:
+            self.admission.record_dump(span.elapsed, span.size)
+
+    def _batch_call(self, args_list, executor, max_workers):
+        _ensure_save_dir()
+        existing = set(os.listdir(_save_dir))
+
+        with _measure(self._record, "fingerprint"):
+            cache_paths = [self._get_cache_path(args, {}) for args in args_list]
+
+        # Identical calls in the same batch are only computed once
+        misses = OrderedDict()
+        for args, cache_path in zip(args_list, cache_paths):
+            if cache_path in misses:
+                continue
+            cached = os.path.basename(cache_path) in existing or _exists(cache_path)
+            if not cached or self._is_too_stale(cache_path):
+                misses[cache_path] = args
+
+        logger.debug(f"Batch call of {self.__qualname__}: {len(cache_paths)} calls, {len(misses)} misses")
+
+        computed = {}
+        if misses:
+            if executor == "process":
+                # The function is sent to the workers by reference, fail before starting any of them
+                pickle.dumps(self)
+            with _get_executor(executor, max_workers) as pool:
+                futures = {
+                    cache_path: pool.submit(self._compute_and_dump, args, {}, cache_path)
+                    for cache_path, args in misses.items()
+                }
+                for cache_path, future in futures.items():
+                    computed[cache_path] = future.result()
+
+        return [computed[path] if path in computed else self._load(path) for path in cache_paths]
+
+    def map(self, iterable, executor="thread", max_workers=None):
+        return self._batch_call([(i,) for i in iterable], executor, max_workers)
+
+    def starmap(self, iterable, executor="thread", max_workers=None):
+        return self._batch_call([tuple(i) for i in iterable], executor, max_workers)
+
+
+def _list_chunks(chunk_dir):
+    # The directory is missing for a moment while a concurrent recompute replaces it
+    for _ in range(_n_chunk_retries):
+        try:
+            return sorted(os.listdir(chunk_dir))
+        except FileNotFoundError:
+            time.sleep(_chunk_retry_interval)
+    return sorted(os.listdir(chunk_dir))
+
+
+def _replay_chunks(chunk_dir, record):
+    load_time = 0
+    names = _list_chunks(chunk_dir)
+    ix = 0
+    while ix < len(names):
+        chunk_path = os.path.join(chunk_dir, names[ix])
+        try:
+            with _measure(record, "load", _get_key(chunk_dir)) as span:
+                chunk = _load(chunk_path)
+                span.size = os.path.getsize(chunk_path)
+        except FileNotFoundError:
+            # Replaced by a concurrent recompute of the same call, continue from the same chunk
+            names = _list_chunks(chunk_dir)
+            if ix < len(names) and os.path.exists(os.path.join(chunk_dir, names[ix])):
+                continue
+            raise
+        load_time += span.elapsed
+        ix += 1
+        yield chunk
+    _count_hit(record, load_time)
+
+
+def _publish_chunks(tmp_dir, chunk_dir, replace):
+    try:
+        os.rename(tmp_dir, chunk_dir)
+        return
+    except OSError:
+        if not os.path.isdir(chunk_dir):
+            raise
+
+    if not replace:
+        # A concurrent writer of the same call has finished first
+        shutil.rmtree(tmp_dir)
+        return
+
+    # The old chunks are renamed aside atomically, rather than removed in place
+    old_dir = f"{chunk_dir}.{uuid.uuid4().hex}.old"
+    try:
+        os.rename(chunk_dir, old_dir)
+    except FileNotFoundError:
+        old_dir = None
+    try:
+        os.rename(tmp_dir, chunk_dir)
+    except OSError:
+        if not os.path.isdir(chunk_dir):
+            raise
+        shutil.rmtree(tmp_dir)
+    if old_dir is not None:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def _record_chunks(gen, chunk_dir, record, recompute=False):
+    # Several generators of the same call may be recording in one thread
+    tmp_dir = f"{chunk_dir}.{uuid.uuid4().hex}.tmp"
+    os.mkdir(tmp_dir)
+    _count_miss(record)
+    finished = False
+    try:
+        ix = 0
+        while True:
+            with _measure(record, "compute", _get_key(chunk_dir)):
+                chunk = next(gen, _end_of_chunks)
+            if chunk is _end_of_chunks:
+                break
+
+            chunk_path = os.path.join(tmp_dir, f"{ix:08d}.pkl")
+            with _measure(record, "dump", _get_key(chunk_dir)) as span:
+                _dump(chunk, chunk_path)
+                span.size = os.path.getsize(chunk_path)
+            ix += 1
+            yield chunk
+        finished = True
+    finally:
+        # A partially consumed or failed generator leaves no checkpoint
+        if finished:
+            _publish_chunks(tmp_dir, chunk_dir, recompute)
+            _publish(chunk_dir, record.name)
+        else:
+            shutil.rmtree(tmp_dir)
+
+
+class _CheckpointGenerator(_CheckpointFunction):
+    def __call__(self, *args, **kwargs):
+        cache_path, recompute = self._prepare_call(args, kwargs)
+        chunk_dir = os.path.splitext(cache_path)[0] + ".chunks"
+
+        if _exists(chunk_dir) and not recompute:
+            return _replay_chunks(chunk_dir, self._record)
+        else:
+            return _record_chunks(self._func(*args, **kwargs), chunk_dir, self._record, recompute)
+
+    def _batch_call(self, args_list, executor, max_workers):
+        raise TypeError(f"map and starmap are not supported for the generator function {self.__qualname__}.")
+
+
+class _CheckpointCoroutine(_CheckpointFunction):
+    def __init__(self, func, ignore, watch_files=()):
+        super().__init__(func, ignore, watch_files=watch_files)
+        self._pending = {}
+
+    async def __call__(self, *args, **kwargs):
+        cache_path, recompute = self._prepare_call(args, kwargs)
+        loop = asyncio.get_running_loop()
+
+        # Concurrent awaits of the same call in one event loop share one task
+        key = (loop, cache_path)
+        if key not in self._pending:
+            task = loop.create_task(self._load_or_compute(args, kwargs, cache_path, recompute))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+
+        return await asyncio.shield(self._pending[key])
+
+    async def _load_or_compute(self, args, kwargs, cache_path, recompute):
+        loop = asyncio.get_running_loop()
+        # Checking the existence may copy the checkpoint from the shared directory
+        if not recompute and await loop.run_in_executor(None, _exists, cache_path):
+            return await loop.run_in_executor(None, self._load, cache_path)
+        else:
+            _count_miss(self._record)
+            with _measure(self._record, "compute", _get_key(cache_path)):
+                res = await self._func(*args, **kwargs)
+            await loop.run_in_executor(None, self._dump_result, res, cache_path)
+            return res
+
+    def _batch_call(self, args_list, executor, max_workers):
+        raise TypeError(
+            f"map and starmap are not supported for the coroutine function {self.__qualname__}, use asyncio.gather instead."
+        )
+
+
+def _concat_blocks(results):
+    if all(_is_pd_object(i) for i in results):
+        return pd.concat(results)
+    elif all(_is_np_array(i) for i in results):
+        return np.concatenate(results)
+    elif all(isinstance(i, list) for i in results):
+        return [j for i in results for j in i]
+    else:
+        raise TypeError(
+            "The return value of a row-wise function must be a pd.DataFrame, pd.Series, np.ndarray or list."
+        )
+
+
+class _CheckpointRowwise(_CheckpointFunction):
+    def __init__(self, func, ignore, rowwise, block_size, watch_files=()):
+        super().__init__(func, ignore, watch_files=watch_files)
+        if rowwise not in inspect.signature(func).parameters:
+            raise ValueError(f"'{rowwise}' is not a parameter of {func.__qualname__}.")
+        if block_size <= 0:
+            raise ValueError("'block_size' must be a positive integer.")
+        self._rowwise = rowwise
+        self._block_size = block_size
+
+    def __call__(self, *args, **kwargs):
+        _ensure_save_dir()
+        recompute = _pop_recompute(kwargs)
+
+        bound = inspect.signature(self._func).bind(*args, **kwargs)
+        # The row-wise parameter may be left at its default
+        bound.apply_defaults()
+        data = bound.arguments[self._rowwise]
+        if _is_pd_object(data):
+            get_block = lambda start, stop: data.iloc[start:stop]
+        elif _is_np_array(data):
+            get_block = lambda start, stop: data[start:stop]
+        else:
+            raise TypeError(f"The row-wise parameter '{self._rowwise}' must be a pd.DataFrame, pd.Series or np.ndarray.")
+
+        if len(data) == 0:
+            return super().__call__(*args, __recompute__=recompute, **kwargs)
+
+        # Each block of rows is checkpointed separately, so that appending rows
+        # only computes the new blocks (and the last incomplete one)
+        results = []
+        keys = []
+        for start in range(0, len(data), self._block_size):
+            bound.arguments[self._rowwise] = get_block(start, start + self._block_size)
+            with _measure(self._record, "fingerprint") as span:
+                cache_path = self._get_cache_path(bound.args, bound.kwargs)
+                span.key = _get_key(cache_path)
+            keys.append(span.key)
+
+            if _exists(cache_path) and not recompute:
+                results.append(self._load(cache_path))
+            else:
+                results.append(self._compute_and_dump(bound.args, bound.kwargs, cache_path))
+
+        res = _concat_blocks(results)
+        _tag_provenance(res, _get_hash_of_str("-".join(keys)), (*args, *kwargs.values()))
+        return res
+
+
+def checkpoint(
+    ignore=[],
+    *,
+    rowwise=None,
+    block_size=10000,
+    refresh=None,
+    refresh_after=60,
+    max_staleness=None,
+    admission="always",
+    watch_files=(),
+):
     if callable(ignore):
         param_is_callable = True
         func = ignore
@@ -33,31 +562,31 @@ def checkpoint(ignore=[]):
     else:
         raise TypeError(f"Unsupported parameter type '{type(ignore)}'")
 
-    def wrapper(func):
-        def inner(*args, **kwargs):
-            if not os.path.exists(_save_dir):
-                os.mkdir(_save_dir)
-            recompute = "__recompute__" in kwargs and kwargs["__recompute__"]
-            if recompute:
-                kwargs.pop("__recompute__")
-
-            _check_handleable(func)
-            file_info = _get_file_info(func)
+    if refresh not in (None, "background"):
+        raise ValueError(f"Unsupported refresh policy '{refresh}', should be either None or 'background'.")
 
-            applied_args = _get_applied_args(func, args, kwargs)
-            id_str = _get_identify_str_for_func(func, applied_args, ignore)
-            hash_val = _get_hash_of_str(file_info + id_str)
+    if admission not in ("always", "adaptive"):
+        raise ValueError(f"Unsupported admission policy '{admission}', should be either 'always' or 'adaptive'.")
 
-            cache_path = os.path.join(_save_dir, f"{hash_val}.pkl")
+    if isinstance(watch_files, (str, os.PathLike)):
+        raise TypeError("'watch_files' must be a list of paths.")
 
-            if os.path.exists(cache_path) and not recompute:
-                return joblib.load(cache_path)
-            else:
-                res = func(*args, **kwargs)
-                joblib.dump(res, cache_path)
-                return res
-
-        return inner
+    def wrapper(func):
+        if refresh is not None or max_staleness is not None or admission != "always":
+            if rowwise is not None or not _is_general_handleable(func):
+                raise ValueError("'refresh', 'max_staleness' and 'admission' are only supported for normal functions.")
+            return _CheckpointFunction(func, ignore, refresh, max_staleness, admission, watch_files, refresh_after)
+
+        if rowwise is not None:
+            if inspect.isgeneratorfunction(func) or inspect.iscoroutinefunction(func):
+                raise NotDecoratableError(func)
+            return _CheckpointRowwise(func, ignore, rowwise, block_size, watch_files)
+        elif inspect.isgeneratorfunction(func):
+            return _CheckpointGenerator(func, ignore, watch_files=watch_files)
+        elif inspect.iscoroutinefunction(func):
+            return _CheckpointCoroutine(func, ignore, watch_files)
+        else:
+            return _CheckpointFunction(func, ignore, watch_files=watch_files)
 
     if param_is_callable:
         return wrapper(func)
@@ -66,11 +595,13 @@ def checkpoint(ignore=[]):
 
 
 class InlineCheckpoint(object):
-    def __init__(self, *, watch, produce):
+    def __init__(self, *, watch, produce, watch_files=()):
         assert isinstance(watch, (list, tuple))
         assert isinstance(produce, (list, tuple))
+        assert isinstance(watch_files, (list, tuple))
         self.watch = watch
         self.produce = produce
+        self.watch_files = watch_files
 
         if not os.path.exists(_save_dir):
             os.mkdir(_save_dir)
@@ -82,8 +613,10 @@ class InlineCheckpoint(object):
 
         self.__check_watch_produce()
 
+        start_wall, start = time.time(), time.perf_counter()
         status_str = self.__get_status_str()
         self.status_hash = _get_hash_of_str(status_str)
+        _add(self._record, "fingerprint", time.perf_counter() - start, start=start_wall, key=self.status_hash)
 
         logger.debug(f"status_str: {status_str}")
 
@@ -131,9 +664,10 @@ class InlineCheckpoint(object):
                     raise e
 
     def __get_start_line_and_indent(self, sourcelines):
+        # watch_files can be any expression, e.g. a variable or a call, possibly spanning several lines
         pattern = (
-            r"""(\s*)with .*?\(\s*watch\s*=\s*[\[\(]\s*['"]?%s['"]?\s*[\]\)]\s*,\s*produce\s*=\s*[\[\(]\s*['"]?%s['"]?\s*[\]\)]\s*\).*?:"""
-            % ("""['"]\s*,\s*['"]""".join(self.watch), """['"]\s*,\s*['"]""".join(self.produce))
+            r"""(\s*)with .*?\(\s*watch\s*=\s*[\[\(]\s*['"]?%s['"]?\s*[\]\)]\s*,\s*produce\s*=\s*[\[\(]\s*['"]?%s['"]?\s*[\]\)]\s*(,\s*watch_files\s*=[\s\S]+?)?\).*?:"""
+            % (r"""['"]\s*,\s*['"]""".join(self.watch), r"""['"]\s*,\s*['"]""".join(self.produce))
         )
 
         matcher = re.compile(pattern)
@@ -205,15 +739,20 @@ class InlineCheckpoint(object):
 
         with_statement = ";".join([i.strip() for i in with_statement_lines]).replace(" ", "")
 
+        # start_line is the index in sourcelines, while the line numbers start from 1
+        self._record = _get_record(f"{file_name}:{start_line + 1}", "block")
+
         identify_str = f"{file_name}-{watch_str}-{with_statement}"
+        if self.watch_files:
+            identify_str += _get_identify_str_for_files(self.watch_files)
         return identify_str
 
     def __checkpoint_exists(self):
         if not self.produce:
-            return os.path.exists(self.__cache_file_name(None))
+            return _exists(self.__cache_file_name(None))
 
         for i in self.produce:
-            if not os.path.exists(self.__cache_file_name(i)):
+            if not _exists(self.__cache_file_name(i)):
                 return False
         return True
 
@@ -231,6 +770,9 @@ class InlineCheckpoint(object):
             sys.settrace(lambda *args, **keys: None)
             frame = sys._getframe(1)
             frame.f_trace = self._trace
+        else:
+            self._memory_probe = _start_memory_probe("compute")
+            self._compute_start_wall, self._compute_start = time.time(), time.perf_counter()
         return self
 
     def _trace(self, frame, event, arg):
@@ -241,13 +783,25 @@ class InlineCheckpoint(object):
             return
 
         if self.skip:
+            load_time = 0
             for i in self.produce:
-                self.__retrieve(i)
-        elif not self.produce:
-            joblib.dump(None, self.__cache_file_name(None))
+                load_time += self.__retrieve(i)
+            _count_hit(self._record, load_time)
         else:
-            for i in self.produce:
-                self.__save(i)
+            _count_miss(self._record)
+            _finish_memory_probe(self._record, "compute", self._memory_probe)
+            _add(
+                self._record,
+                "compute",
+                time.perf_counter() - self._compute_start,
+                start=self._compute_start_wall,
+                key=self.status_hash,
+            )
+            if not self.produce:
+                self.__dump(None, None)
+            else:
+                for i in self.produce:
+                    self.__save(i)
 
         return True
 
@@ -258,7 +812,11 @@ class InlineCheckpoint(object):
         return os.path.join(_save_dir, f"{self.status_hash}-{i}.pkl")
 
     def __retrieve(self, i):
-        obj = joblib.load(self.__cache_file_name(i))
+        cache_path = self.__cache_file_name(i)
+        with _measure(self._record, "load", _get_key(cache_path)) as span:
+            obj = _load(cache_path)
+            span.size = os.path.getsize(cache_path)
+        _tag_provenance(obj, _get_key(cache_path))
 
         if "." not in i:
             self.locals[i] = obj
@@ -270,6 +828,8 @@ class InlineCheckpoint(object):
 
             setattr(curr, ref_list[-1], obj)
 
+        return span.elapsed
+
     def __save(self, i):
         if "." not in i:
             obj = self.locals[i]
@@ -280,4 +840,12 @@ class InlineCheckpoint(object):
                 curr = getattr(curr, ref)
             obj = curr
 
-        joblib.dump(obj, self.__cache_file_name(i))
+        self.__dump(obj, i)
+        _tag_provenance(obj, _get_key(self.__cache_file_name(i)), [*self.locals.values(), *self.globals.values()])
+
+    def __dump(self, obj, i):
+        cache_path = self.__cache_file_name(i)
+        with _measure(self._record, "dump", _get_key(cache_path)) as span:
+            _dump(obj, cache_path)
+            span.size = os.path.getsize(cache_path)
+        _publish(cache_path, self._record.name)
@@ -0,0 +1,73 @@
+import time
+
+from Lutil._lazy import np, _is_pd_object
+from Lutil.checkpoints._checkpoint import checkpoint
+from Lutil.checkpoints._check_util import _get_hash_of_str, _get_identify_str_for_value
+
+
+def _clone(estimator):
+    try:
+        from sklearn.base import clone
+    except ImportError:
+        return type(estimator)(**estimator.get_params(deep=False))
+    return clone(estimator)
+
+
+def _get_splits(cv, estimator, X, y):
+    if isinstance(cv, int) or hasattr(cv, "split"):
+        try:
+            from sklearn.base import is_classifier
+            from sklearn.model_selection import check_cv
+        except ImportError:
+            raise ImportError("scikit-learn is required for splitting the folds, or give 'cv' as a list of (train, test).")
+        cv = check_cv(cv, y, classifier=is_classifier(estimator)).split(X, y)
+    return [(np.asarray(train), np.asarray(test)) for train, test in cv]
+
+
+def _get_scorer(scoring):
+    if scoring is None:
+        return lambda estimator, X, y: estimator.score(X, y)
+    elif isinstance(scoring, str):
+        from sklearn.metrics import get_scorer
+
+        return get_scorer(scoring)
+    else:
+        return scoring
+
+
+def _take(data, rows):
+    if data is None:
+        return None
+    elif _is_pd_object(data):
+        return data.iloc[rows]
+    else:
+        return data[rows]
+
+
+@checkpoint(ignore=["X", "y"])
+def _fit_fold(estimator, train, test, scoring, data_id, X, y):
+    start = time.perf_counter()
+    estimator = _clone(estimator)
+    estimator.fit(_take(X, train), _take(y, train))
+    fit_time = time.perf_counter() - start
+
+    X_test, y_test = _take(X, test), _take(y, test)
+    predictions = estimator.predict(X_test) if hasattr(estimator, "predict") else None
+    score = _get_scorer(scoring)(estimator, X_test, y_test)
+    return estimator, score, predictions, fit_time
+
+
+def cross_validate(estimator, X, y=None, cv=5, scoring=None, executor="process", max_workers=None):
+    splits = _get_splits(cv, estimator, X, y)
+    # The data is identified once, rather than in every fold
+    data_id = _get_hash_of_str(_get_identify_str_for_value(X) + _get_identify_str_for_value(y))
+
+    results = _fit_fold.starmap(
+        [(estimator, train, test, scoring, data_id, X, y) for train, test in splits], executor, max_workers
+    )
+    return {
+        "test_score": np.array([i[1] for i in results]),
+        "fit_time": np.array([i[3] for i in results]),
+        "estimator": [i[0] for i in results],
+        "predictions": [i[2] for i in results],
+    }
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+_table_name = "files.jsonl"
+_read_size = 2 ** 20
+
+_file_hashes = None
+_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+
+class FilePath(str):
+    # Marks a parameter as the path of a file, which is identified by its content rather than the path
+    pass
+
+
+def _get_table_path():
+    from Lutil.checkpoints import _checkpoint
+
+    return os.path.join(_checkpoint._save_dir, _table_name)
+
+
+def _load_table():
+    # The content hash of the files seen by previous runs, the last line of a file wins
+    table = {}
+    path = _get_table_path()
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    continue
+                table[item["path"]] = (tuple(item["stat"]), item["md5"])
+    return table
+
+
+def _save_to_table(path, stat, md5):
+    # The table is rewritten by path so that it does not grow with every rehash,
+    # entries written meanwhile by other processes are kept unless overridden here
+    table_path = _get_table_path()
+    if not os.path.isdir(os.path.dirname(table_path)):
+        return
+    with _write_lock:
+        table = _load_table()
+        table[path] = (stat, md5)
+        tmp_path = f"{table_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for p, (s, m) in table.items():
+                f.write(json.dumps({"path": p, "stat": s, "md5": m}) + "\n")
+        os.replace(tmp_path, table_path)
+
+
+def _hash_file(path):
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for data in iter(lambda: f.read(_read_size), b""):
+            h.update(data)
+    return h.hexdigest()
+
+
+def _get_file_hash(path):
+    global _file_hashes
+    path = os.path.abspath(path)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return f"missing:{path}"
+
+    # The content is only hashed again when the metadata changes,
+    # and a file touched without changes keeps the same hash
+    stat = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    with _lock:
+        if _file_hashes is None:
+            _file_hashes = _load_table()
+        cached = _file_hashes.get(path)
+    if cached is not None and cached[0] == stat:
+        return cached[1]
+
+    md5 = _hash_file(path)
+    current = os.stat(path)
+    if (current.st_ino, current.st_size, current.st_mtime_ns) == stat:
+        # Not cached if the file is being written
+        with _lock:
+            _file_hashes[path] = (stat, md5)
+        _save_to_table(path, stat, md5)
+    return md5
+
+
+def _get_identify_str_for_files(paths):
+    return "-".join(f"file:{_get_file_hash(path)}" for path in paths)
@@ -0,0 +1,108 @@
+import functools
+import os
+import shutil
+import time
+
+from Lutil.checkpoints import _checkpoint
+from Lutil.checkpoints._checkpoint import checkpoint, _get_cache_path
+from Lutil.checkpoints._store import _exists, _read_index
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _get_entries(names):
+    save_dir = _checkpoint._save_dir
+    if not os.path.isdir(save_dir):
+        return []
+    entries = []
+    for entry, name in _read_index(save_dir).items():
+        path = os.path.join(save_dir, entry)
+        if name in names and os.path.exists(path):
+            entries.append(path)
+    return entries
+
+
+class _MemorizedResult(object):
+    def __init__(self, func, cache_path):
+        self.func = func
+        self.cache_path = cache_path
+
+    def get(self):
+        return self.func._load(self.cache_path)
+
+    def clear(self):
+        _remove(self.cache_path)
+
+
+class _MemorizedFunc(object):
+    def __init__(self, func, ignore=None):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.ignore = ignore or []
+        self._checkpoint = checkpoint(self.ignore)(func)
+
+    def __reduce__(self):
+        return (_MemorizedFunc, (self.func, self.ignore))
+
+    def __call__(self, *args, **kwargs):
+        return self._checkpoint(*args, **kwargs)
+
+    def call(self, *args, **kwargs):
+        # joblib returns the metadata of the call as well
+        return self._checkpoint(*args, __recompute__=True, **kwargs), {}
+
+    def call_and_shelve(self, *args, **kwargs):
+        cache_path, recompute = self._checkpoint._prepare_call(args, kwargs)
+        if recompute or not _exists(cache_path):
+            self._checkpoint._compute_and_dump(args, kwargs, cache_path)
+        return _MemorizedResult(self._checkpoint, cache_path)
+
+    def check_call_in_cache(self, *args, **kwargs):
+        return _exists(_get_cache_path(self.func, args, kwargs, self.ignore))
+
+    def clear(self, warn=True):
+        for path in _get_entries({self._checkpoint._record.name}):
+            _remove(path)
+
+
+class Memory(object):
+    def __init__(self):
+        self._names = set()
+
+    @property
+    def location(self):
+        return _checkpoint._save_dir
+
+    def cache(self, func=None, ignore=None, verbose=None, mmap_mode=False, cache_validation_callback=None):
+        if func is None:
+            return functools.partial(self.cache, ignore=ignore)
+
+        memorized = _MemorizedFunc(func, ignore)
+        self._names.add(memorized._checkpoint._record.name)
+        return memorized
+
+    def eval(self, func, *args, **kwargs):
+        return self.cache(func)(*args, **kwargs)
+
+    def clear(self, warn=True):
+        # Only the checkpoints of the functions cached by this object, since the directory is shared
+        for path in _get_entries(self._names):
+            _remove(path)
+
+    def reduce_size(self, bytes_limit=None, items_limit=None, age_limit=None):
+        entries = sorted(_get_entries(self._names), key=os.path.getmtime, reverse=True)
+        now = time.time()
+        total = 0
+        for ix, path in enumerate(entries):
+            total += os.path.getsize(path)
+            if (
+                (items_limit is not None and ix >= items_limit)
+                or (bytes_limit is not None and total > bytes_limit)
+                or (age_limit is not None and now - os.path.getmtime(path) > age_limit.total_seconds())
+            ):
+                _remove(path)
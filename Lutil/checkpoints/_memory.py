@@ -0,0 +1,75 @@
+import sys
+import threading
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+_enabled = False
+_top = 5
+# tracemalloc.reset_peak is only available since Python 3.9
+_can_reset_peak = hasattr(tracemalloc, "reset_peak")
+_active = set()
+_active_lock = threading.Lock()
+
+
+def enable_memory_probe(enabled=True, top=5):
+    global _enabled, _top
+    _enabled = enabled
+    _top = top
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def _get_max_rss():
+    if resource is None:  # pragma: no cover
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, and in kilobytes on Linux
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class _Probe(object):
+    def __init__(self):
+        self.max_rss = _get_max_rss()
+        self.snapshot = tracemalloc.take_snapshot() if _top else None
+        with _active_lock:
+            self.start_traced, peak = tracemalloc.get_traced_memory()
+            self.peak_traced = self.start_traced
+            if _can_reset_peak:
+                # The peak is reset for every new probe, so the probes running in nested calls
+                # or other threads keep the peak reached so far
+                for probe in _active:
+                    probe.peak_traced = max(probe.peak_traced, peak)
+                tracemalloc.reset_peak()
+            _active.add(self)
+
+    def stop(self):
+        with _active_lock:
+            current, peak = tracemalloc.get_traced_memory()
+            _active.discard(self)
+        # Without reset_peak, only the growth of the traced memory at the end is known
+        peak_traced = max(self.peak_traced, peak) if _can_reset_peak else current
+        res = {
+            # The growth of the high-water mark, which is zero if the previous peak is not exceeded
+            "peak_rss": _get_max_rss() - self.max_rss,
+            "peak_traced": max(peak_traced - self.start_traced, 0),
+            "top_allocators": [],
+        }
+
+        if self.snapshot is not None:
+            filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+            diff = tracemalloc.take_snapshot().filter_traces(filters).compare_to(
+                self.snapshot.filter_traces(filters), "lineno"
+            )
+            res["top_allocators"] = [str(stat) for stat in diff[:_top] if stat.size_diff > 0]
+
+        return res
+
+
+def _start_probe():
+    if not _enabled or not tracemalloc.is_tracing():
+        return None
+    return _Probe()
@@ -0,0 +1,164 @@
+import concurrent.futures
+import os
+
+from Lutil._logging import logger
+from Lutil.checkpoints._checkpoint import (
+    checkpoint,
+    _CheckpointFunction,
+    _ensure_save_dir,
+    _get_executor,
+    _get_key,
+)
+from Lutil.checkpoints._check_util import _tag_provenance
+from Lutil.checkpoints._store import _exists
+
+
+def _as_checkpoint(func):
+    # A function wrapped by the pipeline is unpickled as the original function in worker processes
+    return func if isinstance(func, _CheckpointFunction) else checkpoint(func)
+
+
+class _StageOutput(object):
+    # Stands for the output of an upstream stage when identifying a stage, so that
+    # the keys of the whole pipeline are resolved without computing or loading anything
+    def __init__(self, key):
+        self.key = key
+
+    def __str__(self):
+        return f"stage-output-{self.key}"
+
+
+class _StoredOutput(object):
+    # The output of a stage which is only loaded in the worker needing it
+    def __init__(self, func, cache_path):
+        self.func = func
+        self.cache_path = cache_path
+
+    def load(self):
+        return _as_checkpoint(self.func)._load(self.cache_path)
+
+
+def _run_stage(func, inputs, params, cache_path, return_result):
+    args = [i.load() if isinstance(i, _StoredOutput) else i for i in inputs]
+    res = _as_checkpoint(func)._compute_and_dump(args, params, cache_path)
+    # The result is sent back only if it is requested or not saved, e.g. by the adaptive admission
+    saved = os.path.exists(cache_path)
+    return saved, res if return_result or not saved else None
+
+
+class _Stage(object):
+    def __init__(self, name, func, depends, params):
+        self.name = name
+        self.func = func
+        self.depends = depends
+        self.params = params
+
+
+class Pipeline(object):
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, name, func, depends=(), **params):
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' already exists.")
+        func = _as_checkpoint(func)
+        if type(func) is not _CheckpointFunction:
+            raise ValueError("Only normal functions can be used as the stages of a pipeline.")
+
+        self.stages[name] = _Stage(name, func, tuple(depends), params)
+        return self
+
+    def _sort(self):
+        order = []
+        state = {}
+
+        def visit(name, path):
+            if name not in self.stages:
+                raise ValueError(f"Stage '{path[-1]}' depends on an unknown stage '{name}'.")
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"The stages have a circular dependency: {' -> '.join(path + [name])}.")
+
+            state[name] = "visiting"
+            for dep in self.stages[name].depends:
+                visit(dep, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def plan(self, targets=None):
+        _ensure_save_dir()
+        order = self._sort()
+        if targets is None:
+            # By default, the stages which no other stage depends on
+            used = {dep for stage in self.stages.values() for dep in stage.depends}
+            targets = [name for name in order if name not in used]
+        for name in targets:
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}'.")
+
+        cache_paths = {}
+        cached = {}
+        for name in order:
+            stage = self.stages[name]
+            inputs = [_StageOutput(_get_key(cache_paths[dep])) for dep in stage.depends]
+            cache_paths[name] = stage.func._get_cache_path(inputs, stage.params)
+            cached[name] = _exists(cache_paths[name]) and not stage.func._is_too_stale(cache_paths[name])
+
+        # A cached stage is skipped, unless a stage to be computed needs its output
+        to_compute = set()
+        needed = list(targets)
+        while needed:
+            name = needed.pop()
+            if not cached[name] and name not in to_compute:
+                to_compute.add(name)
+                needed.extend(self.stages[name].depends)
+
+        return [name for name in order if name in to_compute], cache_paths, list(targets)
+
+    def run(self, targets=None, executor="process", max_workers=None):
+        to_compute, cache_paths, targets = self.plan(targets)
+        logger.debug(f"Pipeline: {len(self.stages)} stages, {len(to_compute)} to compute")
+
+        values = {}
+        done = set(self.stages) - set(to_compute)
+        pending = list(to_compute)
+        running = {}
+
+        def get_input(dep):
+            if dep in values:
+                return values[dep]
+            return _StoredOutput(self.stages[dep].func, cache_paths[dep])
+
+        if to_compute:
+            with _get_executor(executor, max_workers) as pool:
+                # Every stage is submitted as soon as all its dependencies are finished
+                while pending or running:
+                    for name in [i for i in pending if all(dep in done for dep in self.stages[i].depends)]:
+                        stage = self.stages[name]
+                        inputs = [get_input(dep) for dep in stage.depends]
+                        future = pool.submit(
+                            _run_stage, stage.func, inputs, stage.params, cache_paths[name], name in targets
+                        )
+                        running[future] = name
+                        pending.remove(name)
+
+                    finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in finished:
+                        name = running.pop(future)
+                        saved, res = future.result()
+                        if name in targets or not saved:
+                            values[name] = res
+                        done.add(name)
+
+        params = [value for stage in self.stages.values() for value in stage.params.values()]
+        outputs = {}
+        for name in targets:
+            res = values[name] if name in values else self.stages[name].func._load(cache_paths[name])
+            _tag_provenance(res, _get_key(cache_paths[name]), params)
+            outputs[name] = res
+        return outputs
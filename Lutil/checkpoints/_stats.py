@@ -0,0 +1,174 @@
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+
+from Lutil._logging import logger
+from Lutil.checkpoints import _memory, _trace
+
+_FIELDS = (
+    "hits",
+    "misses",
+    "fingerprint_time",
+    "load_time",
+    "compute_time",
+    "dump_time",
+    "bytes_read",
+    "bytes_written",
+    "time_saved",
+)
+
+_records = {}
+# The records are only reported after they are used, e.g. not for the internal functions never called
+_created_records = {}
+_lock = threading.Lock()
+_exit_summary_registered = False
+
+
+class _Record(object):
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        self.admission = None
+        self.memory = {}
+        for field in _FIELDS:
+            setattr(self, field, 0)
+
+    def as_dict(self):
+        res = {"kind": self.kind}
+        for field in _FIELDS:
+            res[field] = getattr(self, field)
+        if self.admission is not None:
+            res["admit"] = self.admission.admit
+        for group, usage in self.memory.items():
+            for k, v in usage.items():
+                res[f"{group}_{k}"] = v
+        return res
+
+
+class _Span(object):
+    def __init__(self, record, phase, key=None):
+        self.record = record
+        self.phase = phase
+        self.key = key
+        self.size = None
+        self.elapsed = None
+
+
+def _get_record(name, kind="function"):
+    with _lock:
+        if name not in _created_records:
+            _created_records[name] = _Record(name, kind)
+        return _created_records[name]
+
+
+def _use(record):
+    # Must be called with the lock held
+    _records.setdefault(record.name, record)
+
+
+def _add(record, phase, elapsed, size=None, start=None, key=None):
+    if start is not None and _trace._is_tracing():
+        _trace._emit(phase, record.name, start, elapsed, key, size)
+
+    with _lock:
+        _use(record)
+        setattr(record, f"{phase}_time", getattr(record, f"{phase}_time") + elapsed)
+        if size is not None:
+            if phase == "load":
+                record.bytes_read += size
+            elif phase == "dump":
+                record.bytes_written += size
+
+
+def _start_memory_probe(phase):
+    return _memory._start_probe() if phase in ("compute", "load", "dump") else None
+
+
+def _finish_memory_probe(record, phase, probe):
+    if probe is None:
+        return
+
+    # Loading and dumping are reported together as the I/O phase
+    group = "compute" if phase == "compute" else "io"
+    usage = probe.stop()
+    with _lock:
+        current = record.memory.get(group)
+        if current is None:
+            record.memory[group] = usage
+        else:
+            current["peak_rss"] = max(current["peak_rss"], usage["peak_rss"])
+            if usage["peak_traced"] > current["peak_traced"]:
+                current["peak_traced"] = usage["peak_traced"]
+                current["top_allocators"] = usage["top_allocators"]
+
+
+@contextmanager
+def _measure(record, phase, key=None):
+    span = _Span(record, phase, key)
+    probe = _start_memory_probe(phase)
+    start_wall = time.time()
+    start = time.perf_counter()
+    try:
+        yield span
+    finally:
+        span.elapsed = time.perf_counter() - start
+        _finish_memory_probe(record, phase, probe)
+        _add(record, phase, span.elapsed, span.size, start_wall, span.key)
+
+
+def _count_hit(record, load_time):
+    with _lock:
+        _use(record)
+        record.hits += 1
+        # The time saved is estimated by the computations observed in this process
+        if record.misses:
+            record.time_saved += max(record.compute_time / record.misses - load_time, 0)
+
+
+def _count_miss(record):
+    with _lock:
+        _use(record)
+        record.misses += 1
+
+
+def stats():
+    with _lock:
+        return {name: record.as_dict() for name, record in _records.items()}
+
+
+def reset_stats():
+    with _lock:
+        for record in _records.values():
+            for field in _FIELDS:
+                setattr(record, field, 0)
+            record.memory = {}
+
+
+def _format_stats():
+    lines = [
+        f"{'name':<40} {'hits':>6} {'misses':>6} {'hash(s)':>9} {'load(s)':>9} {'compute(s)':>10} "
+        f"{'dump(s)':>9} {'read(MB)':>9} {'write(MB)':>9} {'saved(s)':>9}"
+    ]
+    for name, s in stats().items():
+        lines.append(
+            f"{name[-40:]:<40} {s['hits']:>6} {s['misses']:>6} {s['fingerprint_time']:>9.3f} {s['load_time']:>9.3f} "
+            f"{s['compute_time']:>10.3f} {s['dump_time']:>9.3f} {s['bytes_read'] / 2 ** 20:>9.2f} "
+            f"{s['bytes_written'] / 2 ** 20:>9.2f} {s['time_saved']:>9.3f}"
+        )
+    return "\n".join(lines)
+
+
+def _log_stats():
+    if _records:
+        logger.info("Checkpoint statistics:\n" + _format_stats())
+
+
+def log_stats_at_exit(enabled=True):
+    global _exit_summary_registered
+    with _lock:
+        if enabled and not _exit_summary_registered:
+            atexit.register(_log_stats)
+        elif not enabled and _exit_summary_registered:
+            atexit.unregister(_log_stats)
+        _exit_summary_registered = enabled
@@ -0,0 +1,199 @@
+import concurrent.futures
+import json
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from Lutil._lazy import joblib
+from Lutil._logging import logger
+from Lutil.checkpoints._cache_server import _cache_client, _MISS
+
+_ENV = "LUTIL_SHARED_CHECKPOINT_DIR"
+_index_name = "index.jsonl"
+_index_slack = 64
+
+_shared_dir = os.environ.get(_ENV) or None
+_replication_executor = None
+_replicating = set()
+_lock = threading.Lock()
+_indexes = {}
+_index_lock = threading.Lock()
+
+
+def set_shared_dir(path):
+    global _shared_dir
+    if path is None:
+        _shared_dir = None
+        os.environ.pop(_ENV, None)
+        return
+
+    os.makedirs(path, exist_ok=True)
+    _shared_dir = os.path.abspath(path)
+    # Worker processes started by spawn or forkserver inherit the environment
+    os.environ[_ENV] = _shared_dir
+
+
+def _tmp_path(path):
+    return f"{path}.{uuid.uuid4().hex}.tmp"
+
+
+def _shared_path(cache_path):
+    return os.path.join(_shared_dir, os.path.basename(cache_path))
+
+
+def _copy(src, dst):
+    # Copy to a temporary path and rename it, the modification time is kept for max_staleness
+    tmp_path = _tmp_path(dst)
+    if os.path.isdir(src):
+        shutil.copytree(src, tmp_path)
+        if os.path.isdir(dst):
+            shutil.rmtree(dst)
+    else:
+        shutil.copy2(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+def _exists(cache_path):
+    if os.path.exists(cache_path):
+        return True
+    if _shared_dir is None:
+        return False
+
+    # A hit in the shared directory is promoted to the local one
+    shared_path = _shared_path(cache_path)
+    if not os.path.exists(shared_path):
+        return False
+    try:
+        _copy(shared_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Failed to copy the checkpoint {shared_path} from the shared directory: {e!r}")
+        return False
+    return True
+
+
+def _replicate_now(cache_path, shared_path):
+    try:
+        _copy(cache_path, shared_path)
+    except OSError as e:
+        logger.warning(f"Failed to copy the checkpoint {cache_path} to the shared directory: {e!r}")
+
+
+def _replicate(cache_path):
+    global _replication_executor
+    if _shared_dir is None:
+        return
+
+    with _lock:
+        if _replication_executor is None:
+            _replication_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="Lutil-replication")
+        future = _replication_executor.submit(_replicate_now, cache_path, _shared_path(cache_path))
+        _replicating.add(future)
+    future.add_done_callback(_finish_replication)
+
+
+def _finish_replication(future):
+    with _lock:
+        _replicating.discard(future)
+
+
+def wait_replication(timeout=None):
+    with _lock:
+        futures = list(_replicating)
+    concurrent.futures.wait(futures, timeout=timeout)
+
+
+def _get_index_state(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size
+
+
+def _read_index_lines(path):
+    names = {}
+    n_lines = 0
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                n_lines += 1
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    continue
+                names[item["entry"]] = item["name"]
+    return names, n_lines
+
+
+def _compact_index(path):
+    # Rewrites the index with one line per existing entry, unless another process appends to it meanwhile
+    state = _get_index_state(path)
+    names, _ = _read_index_lines(path)
+    save_dir = os.path.dirname(path)
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for entry, name in names.items():
+            if os.path.exists(os.path.join(save_dir, entry)):
+                f.write(json.dumps({"entry": entry, "name": name}) + "\n")
+    if _get_index_state(path) == state:
+        os.replace(tmp_path, path)
+    else:
+        os.remove(tmp_path)
+
+
+def _register(cache_path, name):
+    # The name of the function or block producing each checkpoint, appended in one write
+    entry = os.path.basename(cache_path)
+    path = os.path.join(os.path.dirname(cache_path), _index_name)
+    with _index_lock:
+        known = _indexes.get(path)
+        if known is None or known["state"] != _get_index_state(path):
+            # Changed by other processes, or removed
+            names, n_lines = _read_index_lines(path)
+            known = _indexes[path] = {"names": names, "n_lines": n_lines, "state": _get_index_state(path)}
+        if known["names"].get(entry) == name:
+            return
+
+        line = json.dumps({"entry": entry, "name": name}) + "\n"
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+        known["names"][entry] = name
+        known["n_lines"] += 1
+        known["state"] = _get_index_state(path)
+
+        if known["n_lines"] > 2 * len(known["names"]) + _index_slack:
+            _compact_index(path)
+            del _indexes[path]
+
+
+def _read_index(save_dir):
+    return _read_index_lines(os.path.join(save_dir, _index_name))[0]
+
+
+def _publish(cache_path, name):
+    if name is not None:
+        _register(cache_path, name)
+    _replicate(cache_path)
+
+
+def _dump(obj, cache_path):
+    # Dump to a temporary file and rename it, so that other processes
+    # sharing the same store never load a partially written checkpoint
+    tmp_path = _tmp_path(cache_path)
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, cache_path)
+
+
+def _load(cache_path):
+    res = _cache_client.load(cache_path)
+    if res is not _MISS:
+        return res
+
+    res = joblib.load(cache_path)
+    _cache_client.warm(cache_path)
+    return res
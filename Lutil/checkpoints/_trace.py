@@ -0,0 +1,69 @@
+import json
+import os
+import threading
+
+_fd = None
+_format = None
+_lock = threading.Lock()
+
+_ENV = "LUTIL_TRACE"
+
+
+def start_trace(path, format="chrome"):
+    global _fd, _format
+    if format not in ("chrome", "jsonl"):
+        raise ValueError(f"Unsupported trace format '{format}', should be either 'chrome' or 'jsonl'.")
+
+    with _lock:
+        if _fd is not None:
+            os.close(_fd)
+
+        # Every process appends to the same file, each event is written in one call
+        _fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+        _format = format
+        if format == "chrome" and os.fstat(_fd).st_size == 0:
+            # The closing bracket is optional in the JSON array format of the trace events
+            os.write(_fd, b"[\n")
+
+    # Worker processes started by spawn or forkserver inherit the environment
+    os.environ[_ENV] = f"{format}:{os.path.abspath(path)}"
+
+
+def stop_trace():
+    global _fd, _format
+    with _lock:
+        if _fd is not None:
+            os.close(_fd)
+        _fd = _format = None
+    os.environ.pop(_ENV, None)
+
+
+def _is_tracing():
+    return _fd is not None
+
+
+def _emit(phase, name, start, elapsed, key=None, size=None):
+    event = {
+        "name": phase,
+        "cat": "Lutil.checkpoints",
+        "ph": "X",
+        "ts": round(start * 1e6, 3),
+        "dur": round(elapsed * 1e6, 3),
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+        "args": {"name": name, "key": key, "size": size},
+    }
+    line = json.dumps(event) + (",\n" if _format == "chrome" else "\n")
+    with _lock:
+        if _fd is not None:
+            os.write(_fd, line.encode("utf-8"))
+
+
+def _start_trace_from_env():
+    setting = os.environ.get(_ENV)
+    if setting:
+        format, path = setting.split(":", 1)
+        start_trace(path, format)
+
+
+_start_trace_from_env()
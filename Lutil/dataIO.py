@@ -1,20 +1,201 @@
+import concurrent.futures
+import copy
 import csv
 import datetime
+import glob
+import hashlib
 import operator
 import os
+import queue
 import re
 import threading
 import warnings
 
-import chardet
-import numpy as np
-import pandas as pd
+from Lutil._lazy import chardet, np, pd, _is_pd_object, _is_np_array
 from Lutil._exceptions import DuplicateSettingWarning, SpeculationFailedError
 from Lutil._logging import logger
-from pandas.api.types import is_numeric_dtype, is_string_dtype
 
 __all__ = ["DataReader", "AutoSaver"]
 
+# Seconds for which the data read in the background is kept if it is not memoized
+_prefetched_ttl = 60
+
+
+def _get_sidecar_prefix(path, read_func, read_kwargs, cache_dir):
+    # Identifies the reading setting, the state of the file is appended to it
+    setting = f"{os.path.abspath(path)}-{read_func.__module__}.{read_func.__qualname__}-{sorted(read_kwargs.items())!r}"
+    setting_hash = hashlib.md5(setting.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{os.path.basename(path)}-{setting_hash}")
+
+
+def _get_file_state(path):
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        # Not a local file, e.g. an URL or a buffer
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _get_sidecar_path(path, read_func, read_kwargs, cache_dir):
+    stat = os.stat(path)
+    state_hash = hashlib.md5(f"{stat.st_size}-{stat.st_mtime_ns}".encode("utf-8")).hexdigest()
+    return f"{_get_sidecar_prefix(path, read_func, read_kwargs, cache_dir)}-{state_hash}"
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow.feather
+    except ImportError:
+        return False
+    return True
+
+
+def _load_sidecar(sidecar_path):
+    if os.path.exists(sidecar_path + ".feather") and _has_pyarrow():
+        import pyarrow.feather
+
+        table = pyarrow.feather.read_table(sidecar_path + ".feather", memory_map=True, use_threads=True)
+        return table.to_pandas(use_threads=True)
+    elif os.path.exists(sidecar_path + ".pkl"):
+        return pd.read_pickle(sidecar_path + ".pkl")
+    else:
+        raise FileNotFoundError(sidecar_path)
+
+
+def _dump_sidecar(df, sidecar_path, prefix):
+    os.makedirs(os.path.dirname(sidecar_path) or ".", exist_ok=True)
+    tmp_path = f"{sidecar_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        try:
+            import pyarrow
+            import pyarrow.feather
+
+            # The index is kept as a column, and restored when converted back
+            table = pyarrow.Table.from_pandas(df, preserve_index=True)
+            pyarrow.feather.write_feather(table, tmp_path)
+            ext = ".feather"
+        except Exception:
+            # pyarrow is missing, or the frame has columns Arrow cannot hold
+            pd.to_pickle(df, tmp_path)
+            ext = ".pkl"
+        os.replace(tmp_path, sidecar_path + ext)
+    except OSError as e:
+        logger.warning(f"Failed to cache the data as {sidecar_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+
+    # The sidecars of previous versions of the file are outdated
+    for outdated in glob.glob(glob.escape(prefix) + "-*"):
+        if not outdated.startswith(sidecar_path) and not outdated.endswith(".tmp"):
+            try:
+                os.remove(outdated)
+            except OSError:
+                pass
+
+
+def _read_data(read_func, path, read_kwargs, cache_dir):
+    if cache_dir is None:
+        return read_func(path, **read_kwargs)
+
+    sidecar_path = _get_sidecar_path(path, read_func, read_kwargs, cache_dir)
+    try:
+        return _load_sidecar(sidecar_path)
+    except FileNotFoundError:
+        pass
+
+    df = read_func(path, **read_kwargs)
+    if isinstance(df, pd.DataFrame):
+        prefix = _get_sidecar_prefix(path, read_func, read_kwargs, cache_dir)
+        _dump_sidecar(df, sidecar_path, prefix)
+    return df
+
+
+def _get_executor(executor, max_workers):
+    if executor == "thread":
+        return concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    elif executor == "process":
+        return concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+    else:
+        raise ValueError(f"Unsupported executor '{executor}', should be either 'thread' or 'process'.")
+
+
+def _copy_data(data):
+    if _is_pd_object(data):
+        try:
+            copy_on_write = pd.get_option("mode.copy_on_write")
+        except KeyError:
+            copy_on_write = False
+        # With copy-on-write, the memoized data is not affected by modifying a shallow copy
+        return data.copy(deep=not copy_on_write)
+    return copy.deepcopy(data)
+
+
+def _iter_chunks(read_func, path, chunksize, read_kwargs):
+    if read_func is pd.read_parquet and set(read_kwargs) <= {"columns"} and _has_pyarrow():
+        import pyarrow.parquet
+
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=read_kwargs.get("columns")):
+            yield batch.to_pandas()
+        return
+
+    reader = read_func(path, chunksize=chunksize, **read_kwargs)
+    if _is_pd_object(reader):
+        logger.warning(f"{read_func} does not read in chunks, the whole data is read before being split.")
+        for start in range(0, len(reader), chunksize):
+            yield reader.iloc[start : start + chunksize]
+        return
+
+    try:
+        yield from reader
+    finally:
+        if hasattr(reader, "close"):
+            reader.close()
+
+
+def _iter_prefetching(iterator, prefetch):
+    # At most 'prefetch' chunks are read ahead by a background thread
+    chunks = queue.Queue(maxsize=prefetch)
+    stopped = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for chunk in iterator:
+                if not put((chunk, None)):
+                    return
+            put((done, None))
+        except BaseException as e:
+            put((None, e))
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            chunk, error = chunks.get()
+            if error is not None:
+                raise error
+            if chunk is done:
+                return
+            yield chunk
+    finally:
+        stopped.set()
+        thread.join()
+
 
 class DataReader(object):
     _instances = {}
@@ -34,7 +215,18 @@ class DataReader(object):
                 DataReader._instances[_id] = new_instance
                 return new_instance
 
-    def __init__(self, train_path=None, test_path=None, val_path=None, _id="default", read_func=None, **read_kwargs):
+    def __init__(
+        self,
+        train_path=None,
+        test_path=None,
+        val_path=None,
+        _id="default",
+        read_func=None,
+        cache_dir=None,
+        memoize=False,
+        speculate=False,
+        **read_kwargs,
+    ):
         assert read_func is None or callable(read_func)
         if hasattr(self, "_id"):
             self.__init_existed__(
@@ -43,6 +235,9 @@ class DataReader(object):
                 val_path=val_path,
                 _id=_id,
                 read_func=read_func,
+                cache_dir=cache_dir,
+                memoize=memoize,
+                speculate=speculate,
                 **read_kwargs,
             )
         else:
@@ -52,11 +247,24 @@ class DataReader(object):
                 val_path=val_path,
                 _id=_id,
                 read_func=read_func,
+                cache_dir=cache_dir,
+                memoize=memoize,
+                speculate=speculate,
                 **read_kwargs,
             )
 
     def __init_existed__(
-        self, train_path=None, test_path=None, val_path=None, *, _id="default", read_func=None, **read_kwargs
+        self,
+        train_path=None,
+        test_path=None,
+        val_path=None,
+        *,
+        _id="default",
+        read_func=None,
+        cache_dir=None,
+        memoize=False,
+        speculate=False,
+        **read_kwargs,
     ):
         assert _id == self._id
         if train_path is not None:
@@ -86,8 +294,48 @@ class DataReader(object):
                     "Newly set data reading function is different from the cached value. If you do want this, please specify '_id=N' as a parameter."
                 )
 
+        if cache_dir is not None:
+            if cache_dir == self.__cache_dir:
+                logger.info(
+                    f"Data caching directory is already set for {self.__class__} object, it's unnecessary to set it again."
+                )
+            else:
+                raise ValueError(
+                    "Newly set data caching directory is different from the cached value. If you do want this, please specify '_id=N' as a parameter."
+                )
+
+        if memoize:
+            if self.__memoize:
+                logger.info(
+                    f"Data memoization is already enabled for {self.__class__} object, it's unnecessary to enable it again."
+                )
+            else:
+                raise ValueError(
+                    "Data memoization is disabled for the cached value. If you do want this, please specify '_id=N' as a parameter."
+                )
+
+        if speculate:
+            if self.__speculate:
+                logger.info(
+                    f"Speculative data reading is already enabled for {self.__class__} object, it's unnecessary to enable it again."
+                )
+            else:
+                raise ValueError(
+                    "Speculative data reading is disabled for the cached value. If you do want this, please specify '_id=N' as a parameter."
+                )
+
     def __init_new__(
-        self, train_path=None, test_path=None, val_path=None, *, _id="default", read_func=None, **read_kwargs
+        self,
+        train_path=None,
+        test_path=None,
+        val_path=None,
+        *,
+        _id="default",
+        read_func=None,
+        cache_dir=None,
+        memoize=False,
+        speculate=False,
+        **read_kwargs,
     ):
         try:
             if train_path is not None:
@@ -102,6 +350,12 @@ class DataReader(object):
         self._id = _id
         self.__read_kwargs = read_kwargs
         self.__read_func = read_func
+        self.__cache_dir = cache_dir
+        self.__memoize = memoize
+        self.__speculate = speculate
+        self.__memo = {}
+        self.__prefetched = {}
+        self.__memo_lock = threading.Lock()
 
         if self.__read_func is None:
             self.__read_func = pd.read_csv
@@ -179,14 +433,115 @@ class DataReader(object):
             warnings.warn(DuplicateSettingWarning("val", self))
             self._val_path = value
 
+    def __get_splits(self):
+        return [
+            (split, getattr(self, f"_{split}_path"))
+            for split in ("train", "test", "val")
+            if hasattr(self, f"_{split}_path")
+        ]
+
+    def __submit(self, path, pool):
+        state = _get_file_state(path)
+        with self.__memo_lock:
+            # The prefetched data is only used once if it is not memoized
+            target = self.__memo if self.__memoize else self.__prefetched
+            memo = target.get(path)
+            if memo is not None and memo[0] == state:
+                return
+            memo = (state, pool.submit(_read_data, self.__read_func, path, self.__read_kwargs, self.__cache_dir))
+            target[path] = memo
+
+        def forget_failed(future):
+            if future.cancelled() or future.exception() is not None:
+                self.__forget(path, memo)
+            elif not self.__memoize:
+                # Released if it is not taken in time, so that unused data does not stay in memory
+                timer = threading.Timer(_prefetched_ttl, self.__forget, (path, memo))
+                timer.daemon = True
+                timer.start()
+
+        memo[1].add_done_callback(forget_failed)
+
+    def __forget(self, path, memo):
+        with self.__memo_lock:
+            for target in (self.__memo, self.__prefetched):
+                if target.get(path) is memo:
+                    del target[path]
+
+    def __read(self, path):
+        state = _get_file_state(path)
+        with self.__memo_lock:
+            memo = self.__memo.get(path) if self.__memoize else self.__prefetched.pop(path, None)
+            if memo is None or memo[0] != state:
+                # Other threads reading the same file wait for this one
+                memo = (state, concurrent.futures.Future())
+                if self.__memoize:
+                    self.__memo[path] = memo
+                loading = True
+            else:
+                loading = False
+
+        future = memo[1]
+        if loading:
+            try:
+                future.set_result(_read_data(self.__read_func, path, self.__read_kwargs, self.__cache_dir))
+            except BaseException as e:
+                future.set_exception(e)
+                self.__forget(path, memo)
+                raise
+        return _copy_data(future.result()) if self.__memoize else future.result()
+
+    def __read_split(self, split):
+        path = getattr(self, f"{split}_path")
+        if self.__speculate:
+            # The splits following this one are likely to be read next
+            splits = self.__get_splits()
+            following = [i for i in splits[[i[0] for i in splits].index(split) + 1 :] if i[1] != path]
+            if following:
+                pool = _get_executor("thread", 1)
+                for _, following_path in following:
+                    self.__submit(following_path, pool)
+                pool.shutdown(wait=False)
+        return self.__read(path)
+
+    def __iter(self, path, chunksize, prefetch):
+        if chunksize <= 0:
+            raise ValueError("'chunksize' must be a positive integer.")
+        iterator = _iter_chunks(self.__read_func, path, chunksize, self.__read_kwargs)
+        if prefetch:
+            return _iter_prefetching(iterator, prefetch)
+        return iterator
+
     def train(self):
-        return self.__read_func(self.train_path, **self.__read_kwargs)
+        return self.__read_split("train")
 
     def test(self):
-        return self.__read_func(self.test_path, **self.__read_kwargs)
+        return self.__read_split("test")
 
     def val(self):
-        return self.__read_func(self.val_path, **self.__read_kwargs)
+        return self.__read_split("val")
+
+    def prefetch(self, executor="thread", max_workers=None):
+        splits = self.__get_splits()
+        if not splits:
+            return
+        pool = _get_executor(executor, max_workers or len(splits))
+        for _, path in splits:
+            self.__submit(path, pool)
+        pool.shutdown(wait=False)
+
+    def read_all(self, executor="thread", max_workers=None):
+        self.prefetch(executor, max_workers)
+        return {split: self.__read(path) for split, path in self.__get_splits()}
+
+    def iter_train(self, chunksize, prefetch=0):
+        return self.__iter(self.train_path, chunksize, prefetch)
+
+    def iter_test(self, chunksize, prefetch=0):
+        return self.__iter(self.test_path, chunksize, prefetch)
+
+    def iter_val(self, chunksize, prefetch=0):
+        return self.__iter(self.val_path, chunksize, prefetch)
 
 
 class AutoSaver(object):
@@ -208,7 +563,7 @@ class AutoSaver(object):
         if self.example_path:
             return self.__save_by_to_csv_speculating(X, filename)
         else:
-            if not isinstance(X, (pd.DataFrame, pd.Series)):
+            if not _is_pd_object(X):
                 raise TypeError(
                     f"'X' must be a pd.DataFrame or pd.Series, rather than {X.__class__} if you do not provide an example csv file, or are using self-defined keyword parameters."
                 )
@@ -216,7 +571,7 @@ class AutoSaver(object):
 
     def __speculate_ordered_index(self, s):
         s = s.copy()
-        if is_string_dtype(s):
+        if pd.api.types.is_string_dtype(s):
             return (True, s.iloc[0])
 
         step = len(s) // 100 + 1
@@ -261,7 +616,7 @@ class AutoSaver(object):
         with open(self.example_path, "r", encoding=enc) as f:
             df = pd.read_csv(f, header=None, nrows=1)
 
-        has_header = is_string_dtype(df.iloc[0, :])
+        has_header = pd.api.types.is_string_dtype(df.iloc[0, :])
 
         with open(self.example_path, "r", encoding=enc) as f:
             sniffer = csv.Sniffer()
@@ -291,7 +646,7 @@ class AutoSaver(object):
         self.__dialect_kwargs = dialect_kwargs
 
     def __save_by_to_csv_speculating(self, X, filename):
-        if not isinstance(X, (pd.DataFrame, pd.Series, np.ndarray)):
+        if not (_is_pd_object(X) or _is_np_array(X)):
             raise TypeError(
                 f"'X' must be either a pd.DataFrame, pd.Series or np.ndarray, rather than {X.__class__} if you provide an example csv file."
             )
@@ -310,13 +665,13 @@ class AutoSaver(object):
             X = self.__try_add_column(X)
 
         for i in range(X.shape[1]):
-            if self.__speculate_ordered_index(X.iloc[:, i])[0] and is_numeric_dtype(X.iloc[:, i]):
+            if self.__speculate_ordered_index(X.iloc[:, i])[0] and pd.api.types.is_numeric_dtype(X.iloc[:, i]):
                 X.iloc[:, i] = X.iloc[:, i].astype(int)
             else:
                 break
 
         example_spec_res = self.__speculate_ordered_index(self.__example_df.iloc[:, 0])
-        if example_spec_res[0] and is_numeric_dtype(example_spec_res[1]):
+        if example_spec_res[0] and pd.api.types.is_numeric_dtype(example_spec_res[1]):
             X.iloc[:, 0] = np.arange(example_spec_res[1], example_spec_res[1] + X.shape[0])
 
         fullpath = os.path.join(self.save_dir, filename)
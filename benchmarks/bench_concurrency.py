@@ -0,0 +1,38 @@
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from Lutil.checkpoints import checkpoint
+
+N_CALLS = 16
+
+
+@checkpoint
+def make_block(i):
+    return np.full(1 << 17, i, dtype=np.float64)
+
+
+def clear():
+    shutil.rmtree(".Lutil-checkpoint", ignore_errors=True)
+
+
+@pytest.mark.parametrize("n_workers", [1, 4, 16])
+def test_distinct_keys(benchmark, n_workers):
+    benchmark.group = "concurrent writers, distinct keys"
+    benchmark.extra_info["workers"] = n_workers
+    benchmark.pedantic(
+        make_block.map, args=(range(N_CALLS),), kwargs={"max_workers": n_workers}, setup=clear, rounds=10
+    )
+
+
+@pytest.mark.parametrize("n_workers", [1, 4, 16])
+def test_same_key(benchmark, n_workers):
+    def run():
+        with ThreadPoolExecutor(n_workers) as pool:
+            list(pool.map(lambda _: make_block(0, __recompute__=True), range(N_CALLS)))
+
+    benchmark.group = "concurrent writers, same key"
+    benchmark.extra_info["workers"] = n_workers
+    benchmark.pedantic(run, rounds=10)
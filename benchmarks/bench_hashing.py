@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Lutil.checkpoints._check_util import _get_identify_str_for_value
+
+SIZES = [1000, 100000, 1000000]
+
+
+def make_frame(dtype, n_rows):
+    rng = np.random.RandomState(0)
+    if dtype == "int64":
+        return pd.DataFrame(rng.randint(0, 1000, size=(n_rows, 4)))
+    elif dtype == "float64":
+        return pd.DataFrame(rng.rand(n_rows, 4))
+    elif dtype == "object":
+        return pd.DataFrame(rng.randint(0, 1000, size=(n_rows, 4)).astype(str).astype(object))
+    elif dtype == "category":
+        return pd.DataFrame(rng.randint(0, 10, size=(n_rows, 4))).astype("category")
+
+
+@pytest.mark.parametrize("n_rows", SIZES)
+@pytest.mark.parametrize("dtype", ["int64", "float64", "object", "category"])
+def test_hash_dataframe(benchmark, dtype, n_rows):
+    df = make_frame(dtype, n_rows)
+    benchmark.group = f"hash DataFrame {dtype}"
+    benchmark.extra_info["bytes"] = int(df.memory_usage(deep=True).sum())
+    benchmark(_get_identify_str_for_value, df)
+
+
+@pytest.mark.parametrize("n_rows", SIZES)
+@pytest.mark.parametrize("dtype", ["int64", "float64"])
+def test_hash_ndarray(benchmark, dtype, n_rows):
+    arr = make_frame(dtype, n_rows).to_numpy()
+    benchmark.group = f"hash ndarray {dtype}"
+    benchmark.extra_info["bytes"] = int(arr.nbytes)
+    benchmark(_get_identify_str_for_value, arr)
@@ -0,0 +1,25 @@
+import pytest
+
+SCRIPT = """
+from Lutil.checkpoints import InlineCheckpoint
+
+a = 1
+{filler}
+with InlineCheckpoint(watch=["a"], produce=["b"]):
+    b = a + 1
+"""
+
+
+@pytest.mark.parametrize("n_lines", [100, 1000, 10000])
+def test_inline_entry(benchmark, checkpoint_dir, n_lines):
+    path = checkpoint_dir / f"script_{n_lines}.py"
+    path.write_text(SCRIPT.format(filler="\n".join(f"x_{i} = {i}" for i in range(n_lines))), encoding="utf-8")
+    code = compile(path.read_text(encoding="utf-8"), str(path), "exec")
+
+    def run():
+        exec(code, {"__name__": "__main__", "__file__": str(path)})
+
+    run()
+    benchmark.group = "InlineCheckpoint entry (hit) by source length"
+    benchmark.extra_info["lines"] = n_lines
+    benchmark(run)
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Lutil.checkpoints import checkpoint
+
+
+@checkpoint
+def identity(x):
+    return 0
+
+
+class Params(object):
+    def __init__(self):
+        self.alpha = 0.1
+        self.n_estimators = 100
+        self.coef = np.arange(1000, dtype=np.float64)
+
+
+ARGS = {
+    "scalar": lambda: 1,
+    "str": lambda: "a" * 100,
+    "array": lambda: np.random.RandomState(0).rand(100000),
+    "dataframe": lambda: pd.DataFrame(np.random.RandomState(0).rand(100000, 10)),
+    "object": Params,
+}
+
+
+@pytest.mark.parametrize("kind", list(ARGS))
+def test_hit_overhead(benchmark, kind):
+    arg = ARGS[kind]()
+    identity(arg)
+    benchmark.group = "per-call overhead (hit)"
+    benchmark(identity, arg)
+
+
+@pytest.mark.parametrize("kind", list(ARGS))
+def test_miss_overhead(benchmark, kind):
+    arg = ARGS[kind]()
+    benchmark.group = "per-call overhead (miss)"
+    benchmark(identity, arg, __recompute__=True)
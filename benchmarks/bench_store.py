@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from Lutil.checkpoints import checkpoint
+
+SIZES = [1 << 10, 1 << 20, 1 << 26]
+
+
+@checkpoint
+def make_result(n_bytes):
+    return np.zeros(n_bytes // 8)
+
+
+@pytest.mark.parametrize("n_bytes", SIZES)
+def test_hit_latency(benchmark, n_bytes):
+    make_result(n_bytes)
+    benchmark.group = "hit latency by result size"
+    benchmark.extra_info["bytes"] = n_bytes
+    benchmark(make_result, n_bytes)
+
+
+@pytest.mark.parametrize("n_bytes", SIZES)
+def test_miss_latency(benchmark, n_bytes):
+    benchmark.group = "miss latency by result size"
+    benchmark.extra_info["bytes"] = n_bytes
+    benchmark(make_result, n_bytes, __recompute__=True)
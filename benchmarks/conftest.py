@@ -0,0 +1,19 @@
+# Benchmarks of the checkpoint layer, based on pytest-benchmark.
+#
+#   pip install pytest-benchmark
+#   python -m pytest benchmarks --benchmark-json=benchmark.json
+#
+# Use --benchmark-autosave and --benchmark-compare to compare the results across versions.
+
+import sys
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def checkpoint_dir(tmp_path, monkeypatch):
+    # Every benchmark uses an empty checkpoint directory
+    monkeypatch.chdir(tmp_path)
+    trace = sys.gettrace()
+    yield tmp_path
+    sys.settrace(trace)
@@ -0,0 +1,138 @@
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+
+from Lutil.checkpoints import checkpoint, export_checkpoints, import_checkpoints
+
+from checkpoint_test_base import R, CheckpointBaseTest
+
+save_dir = ".Lutil-checkpoint"
+
+
+@checkpoint
+def square(a):
+    R()
+    return a * a
+
+
+@checkpoint
+def cube(a):
+    R()
+    return a * a * a
+
+
+@checkpoint
+def count_to(n):
+    R()
+    for i in range(n):
+        yield i
+
+
+class BundleTest(CheckpointBaseTest):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.archive = os.path.join(self.tmp_dir, "checkpoints.tar")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        super().tearDown()
+
+    def drop_local(self):
+        shutil.rmtree(save_dir)
+
+    def test_export_import(self):
+        square.map([1, 2])
+        self.assertEqual(list(count_to(3)), [0, 1, 2])
+        self.runned_times(3)
+
+        self.assertEqual(export_checkpoints(self.archive), 3)
+        self.drop_local()
+        self.assertEqual(import_checkpoints(self.archive), 3)
+
+        self.assertEqual(square.map([1, 2]), [1, 4])
+        self.assertEqual(list(count_to(3)), [0, 1, 2])
+        self.not_runned()
+
+    def test_import_missing_only(self):
+        square.map([1, 2])
+        self.runned_times(2)
+        export_checkpoints(self.archive)
+
+        entries = sorted(i for i in os.listdir(save_dir) if i.endswith(".pkl"))
+        os.remove(os.path.join(save_dir, entries[0]))
+        self.assertEqual(import_checkpoints(self.archive), 1)
+        self.assertEqual(import_checkpoints(self.archive), 0)
+
+    def test_select_by_function(self):
+        square(2)
+        cube(2)
+        self.runned_times(2)
+
+        self.assertEqual(export_checkpoints(self.archive, functions=[square]), 1)
+        self.drop_local()
+        import_checkpoints(self.archive)
+
+        square(2)
+        self.not_runned()
+        cube(2)
+        self.runned()
+
+    def test_select_by_age_and_keys(self):
+        square(2)
+        cube(2)
+        self.runned_times(2)
+        entries = sorted(i for i in os.listdir(save_dir) if i.endswith(".pkl"))
+
+        old = time.time() - 3600
+        os.utime(os.path.join(save_dir, entries[0]), (old, old))
+        self.assertEqual(export_checkpoints(self.archive, max_age=60), 1)
+        self.assertEqual(export_checkpoints(self.archive, keys=[os.path.splitext(entries[0])[0]]), 1)
+
+    def test_integrity_check(self):
+        square(2)
+        self.runned()
+        export_checkpoints(self.archive)
+        self.drop_local()
+
+        with tarfile.open(self.archive) as tar:
+            member = next(i for i in tar.getmembers() if i.name.endswith(".pkl"))
+        with open(self.archive, "r+b") as f:
+            f.seek(member.offset_data + member.size - 1)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_CUR)
+            f.write(bytes([last[0] ^ 0xFF]))
+
+        self.assertEqual(import_checkpoints(self.archive), 0)
+        self.assertEqual([i for i in os.listdir(save_dir) if not i.endswith(".jsonl")], [])
+
+    def test_not_archive(self):
+        with tarfile.open(self.archive, "w") as tar:
+            tar.add(__file__, "foo.py")
+        with self.assertRaises(ValueError):
+            import_checkpoints(self.archive)
+
+    def test_index_deduplicated(self):
+        index_path = os.path.join(save_dir, "index.jsonl")
+        for _ in range(3):
+            square(2, __recompute__=True)
+        self.runned_times(3)
+        with open(index_path) as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+        # e.g. appended by other processes
+        with open(index_path, "a") as f:
+            f.write('{"entry": "missing.pkl", "name": "some.function"}\n' * 200)
+        square(3)
+        self.runned()
+        with open(index_path) as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), 2)
+        self.assertNotIn("missing.pkl", "".join(lines))
+
+        self.drop_local()
+        square(2)
+        self.runned()
+        self.assertEqual(export_checkpoints(self.archive, functions=[square]), 1)
@@ -0,0 +1,191 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import Lutil.checkpoints._cache_server as cache_server
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+from Lutil.checkpoints import InlineCheckpoint, serve_cache, stop_cache_server, enable_zero_copy
+
+from checkpoint_test_base import R, CheckpointBaseTest
+from checkpoint_slave import make_zeros, is_loaded_from_cache_server
+
+
+class Foo(object):
+    pass
+
+
+def inline_zeros(n):
+    f = Foo()
+    with InlineCheckpoint(watch=["n"], produce=["f.a"]):
+        R()
+        f.a = make_zeros.__wrapped__(n)
+    return f.a
+
+
+class CacheServerTest(CheckpointBaseTest):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.address = cache_server._server_address
+        cache_server._server_address = os.path.join(self.tmp_dir, "server.sock")
+        cache_server._cache_client.reset()
+
+        self.server = threading.Thread(target=serve_cache, kwargs={"max_bytes": 2 ** 20})
+        self.server.start()
+        self.wait_for(lambda: os.path.exists(cache_server._server_address))
+
+    def tearDown(self):
+        if self.server.is_alive():
+            stop_cache_server()
+            self.server.join()
+        cache_server._server_address = self.address
+        cache_server._cache_client.reset()
+        enable_zero_copy(False)
+        shutil.rmtree(self.tmp_dir)
+        super().tearDown()
+
+    def wait_for(self, condition):
+        for _ in range(100):
+            if condition():
+                return
+            time.sleep(0.05)
+        self.fail("Timeout")
+
+    def n_entries(self):
+        return cache_server._cache_client.stats()["entries"]
+
+    def hits(self):
+        return cache_server._cache_client.hits
+
+    def test_load_from_server(self):
+        make_zeros(100)
+        self.assertEqual(self.n_entries(), 0)
+
+        # Loaded from the disk, then the server caches it
+        make_zeros(100)
+        self.assertEqual(self.hits(), 0)
+        self.wait_for(lambda: self.n_entries() == 1)
+
+        # Copied by default, so it can be modified in place
+        res = make_zeros(100)
+        self.assertEqual(self.hits(), 1)
+        self.assertTrue(res.flags.writeable)
+        res[0] = 1
+        self.assertEqual(make_zeros(100).sum(), 0)
+        self.assertEqual(len(res), 100)
+
+    def test_zero_copy(self):
+        make_zeros(100)
+        make_zeros(100)
+        self.wait_for(lambda: self.n_entries() == 1)
+
+        enable_zero_copy()
+        res = make_zeros(100)
+        self.assertEqual(self.hits(), 1)
+        self.assertFalse(res.flags.writeable)
+        self.assertEqual(res.sum(), 0)
+
+    def test_authentication(self):
+        address = cache_server._server_address
+        self.assertEqual(os.stat(address + ".key").st_mode & 0o777, 0o600)
+        with self.assertRaises(AuthenticationError):
+            Client(address, family="AF_UNIX", authkey=b"wrong")
+
+        # The server keeps serving the other clients
+        make_zeros(100)
+        make_zeros(100)
+        self.wait_for(lambda: self.n_entries() == 1)
+
+    def test_untrusted_key(self):
+        make_zeros(100)
+        make_zeros(100)
+        self.wait_for(lambda: self.n_entries() == 1)
+
+        os.chmod(cache_server._server_address + ".key", 0o644)
+        cache_server._cache_client.reset()
+        with self.assertLogs("Lutil", level="WARNING"):
+            make_zeros(100)
+        self.assertEqual(self.hits(), 0)
+        os.chmod(cache_server._server_address + ".key", 0o600)
+
+    def test_runtime_dir(self):
+        runtime_dir = os.path.join(self.tmp_dir, "runtime")
+        os.mkdir(runtime_dir, 0o700)
+        os.environ["XDG_RUNTIME_DIR"] = runtime_dir
+        try:
+            path = cache_server._get_runtime_dir()
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o700)
+
+            os.chmod(path, 0o755)
+            with self.assertRaises(PermissionError):
+                cache_server._get_runtime_dir()
+        finally:
+            del os.environ["XDG_RUNTIME_DIR"]
+
+    def test_other_process(self):
+        make_zeros(200)
+        make_zeros(200)
+        self.wait_for(lambda: self.n_entries() == 1)
+
+        with ProcessPoolExecutor(1) as pool:
+            self.assertTrue(pool.submit(is_loaded_from_cache_server, 200).result())
+
+    def test_inline(self):
+        inline_zeros(10)
+        self.runned()
+        inline_zeros(10)
+        self.wait_for(lambda: self.n_entries() == 1)
+
+        inline_zeros(10)
+        self.assertEqual(self.hits(), 1)
+        self.not_runned()
+
+    def test_changed_file(self):
+        make_zeros(100)
+        make_zeros(100)
+        self.wait_for(lambda: self.n_entries() == 1)
+
+        make_zeros(100, __recompute__=True)
+        make_zeros(100)
+        self.assertEqual(self.hits(), 0)
+
+    def test_eviction(self):
+        make_zeros(50000)
+        make_zeros(50000)
+        self.wait_for(lambda: self.n_entries() == 1)
+
+        # The limit is 1MB, so the previous entry is evicted
+        make_zeros(100000)
+        make_zeros(100000)
+        self.wait_for(lambda: cache_server._cache_client.stats()["nbytes"] == 100000 * 8)
+        self.assertEqual(self.n_entries(), 1)
+        make_zeros(50000)
+        self.assertEqual(self.hits(), 0)
+
+    def test_fall_back(self):
+        make_zeros(100)
+        stop_cache_server()
+        self.server.join()
+        make_zeros(100)
+        self.assertEqual(self.hits(), 0)
+
+    def test_unsupported(self):
+        make_zeros(100)
+        make_zeros(100)
+        self.wait_for(lambda: self.n_entries() == 1)
+
+        # e.g. Python 3.7, where the checkpoints are loaded by joblib only
+        is_supported = cache_server._is_supported
+        cache_server._is_supported = lambda: False
+        cache_server._cache_client.reset()
+        try:
+            make_zeros(100)
+            self.assertEqual(self.hits(), 0)
+            self.assertIsNone(cache_server._cache_client.conn)
+        finally:
+            cache_server._is_supported = is_supported
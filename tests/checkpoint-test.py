@@ -1,11 +1,17 @@
 import numpy as np
 import pandas as pd
 
+import asyncio
 import datetime
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
 from Lutil.checkpoints import checkpoint
 from Lutil._exceptions import NotDecoratableError
 
 from checkpoint_test_base import R, CheckpointBaseTest
+from checkpoint_slave import square_with_pid, sum_with_pid, Bar
 
 
 @checkpoint
@@ -50,6 +56,70 @@ def return_attr_a(obj):
     return obj.a
 
 
+@checkpoint
+def count_to(n):
+    for i in range(n):
+        R()
+        yield i
+
+
+@checkpoint
+async def async_adding(a, b):
+    R()
+    await asyncio.sleep(0.01)
+    return a+b
+
+
+@checkpoint(rowwise="df", block_size=2)
+def rowwise_double(df, factor=2):
+    R()
+    return df * factor
+
+
+@checkpoint(rowwise="data", block_size=2)
+def rowwise_scale(scale=2, data=np.arange(5)):
+    R()
+    return data * scale
+
+
+external_state = {"value": 0}
+
+
+@checkpoint(refresh="background", refresh_after=0)
+def read_external_state(key):
+    R()
+    return external_state[key]
+
+
+@checkpoint(refresh="background", refresh_after=0)
+def sum_with_external_state(values):
+    R()
+    return sum(values) + external_state["value"]
+
+
+@checkpoint(refresh="background")
+def read_external_state_refreshed_later(key):
+    R()
+    return external_state[key]
+
+
+@checkpoint(max_staleness=0.5)
+def read_external_state_with_staleness(key):
+    R()
+    return external_state[key]
+
+
+@checkpoint(admission="adaptive")
+def cheap_but_large(seed):
+    return np.full(1000000, seed)
+
+
+@checkpoint(admission="adaptive")
+def expensive_but_small(seed):
+    time.sleep(0.05)
+    return seed
+
+
 class Foo(object):
     def __init__(self):
         self.a = 1
@@ -289,13 +359,84 @@ class CheckpointTest(CheckpointBaseTest):
         self.not_runned()
         self.assertLessEqual((stop-start).seconds, 10)
 
-    def test_not_generator(self):
+    def test_not_async_generator(self):
         with self.assertRaises(NotDecoratableError):
             @checkpoint
-            def some_generator():
+            async def some_async_generator():
                 yield 0
 
-            next(some_generator())
+            some_async_generator()
+
+    def test_generator(self):
+        self.assertEqual(list(count_to(3)), [0, 1, 2])
+        self.runned_times(3)
+
+        self.assertEqual(list(count_to(3)), [0, 1, 2])
+        self.not_runned()
+
+        self.assertEqual(list(count_to(2)), [0, 1])
+        self.runned_times(2)
+
+        self.assertEqual(list(count_to(2, __recompute__=True)), [0, 1])
+        self.runned_times(2)
+
+    def test_generator_is_lazy(self):
+        gen = count_to(3)
+        self.not_runned()
+
+        self.assertEqual(next(gen), 0)
+        self.runned()
+        list(gen)
+        self.clear()
+
+        gen = count_to(3)
+        self.assertEqual(next(gen), 0)
+        self.not_runned()
+
+    def test_generator_partially_consumed(self):
+        gen = count_to(3)
+        next(gen)
+        gen.close()
+        self.runned()
+
+        self.assertEqual(list(count_to(3)), [0, 1, 2])
+        self.runned_times(3)
+
+        self.assertEqual(list(count_to(3)), [0, 1, 2])
+        self.not_runned()
+
+    def test_generator_concurrent_writers(self):
+        first, second = count_to(3), count_to(3)
+        self.assertEqual(next(first), 0)
+        self.assertEqual(list(second), [0, 1, 2])
+        # The same call is already saved by the other writer
+        self.assertEqual(list(first), [1, 2])
+        self.runned_times(6)
+
+        self.assertEqual(list(count_to(3)), [0, 1, 2])
+        self.not_runned()
+
+        first, second = count_to(3, __recompute__=True), count_to(3, __recompute__=True)
+        list(second)
+        self.assertEqual(list(first), [0, 1, 2])
+        self.runned_times(6)
+        self.assertEqual(list(count_to(3)), [0, 1, 2])
+        self.not_runned()
+
+    def test_generator_replay_while_recomputing(self):
+        list(count_to(3))
+        self.clear()
+
+        replay = count_to(3)
+        self.assertEqual(next(replay), 0)
+        self.assertEqual(list(count_to(3, __recompute__=True)), [0, 1, 2])
+        self.runned_times(3)
+        # The replaced chunks are read from the same position
+        self.assertEqual(list(replay), [1, 2])
+
+    def test_generator_map(self):
+        with self.assertRaises(TypeError):
+            count_to.map([1, 2])
 
     def test_wrong_ignore(self):
         with self.assertRaises(TypeError):
@@ -363,3 +504,249 @@ class CheckpointTest(CheckpointBaseTest):
 
         return_input(arr2)
         self.not_runned()
+
+    def test_map(self):
+        self.assertEqual(return_input.map([1, 2, 3]), [1, 2, 3])
+        self.runned_times(3)
+
+        self.assertEqual(return_input.map([1, 2, 3]), [1, 2, 3])
+        self.not_runned()
+
+        self.assertEqual(return_input.map([3, 4, 5, 4]), [3, 4, 5, 4])
+        self.runned_times(2)
+
+        self.assertEqual(return_input(5), 5)
+        self.not_runned()
+
+    def test_starmap(self):
+        self.assertEqual(adding.starmap([(1, 2), (3, 4)]), [3, 7])
+        self.runned_times(2)
+
+        self.assertEqual(adding.starmap([(3, 4), (5, 6)], max_workers=2), [7, 11])
+        self.runned()
+
+        self.assertEqual(adding_with_ignore.starmap([(1, 2), (9, 2)]), [3, 3])
+        self.runned()
+
+    def test_map_method(self):
+        f = Foo()
+        self.assertEqual(f.with_args.map([1, 2]), [2, 3])
+        self.runned_times(2)
+
+        self.assertEqual(f.with_args.starmap([(1,), (2,)]), [2, 3])
+        self.not_runned()
+
+        self.assertEqual(f.with_args(2), 3)
+        self.not_runned()
+
+        self.assertEqual(Bar().double.map([1, 2], executor="process"), [2, 4])
+
+    def test_map_wrong_executor(self):
+        with self.assertRaises(ValueError):
+            return_input.map([1], executor="gpu")
+
+    def test_pickle(self):
+        self.assertIs(pickle.loads(pickle.dumps(square_with_pid)), square_with_pid)
+        self.assertIs(pickle.loads(pickle.dumps(Bar.double)), Bar.double)
+        self.assertEqual(pickle.loads(pickle.dumps(Bar().double))(2), 4)
+
+        @checkpoint
+        def local_func():
+            return 0
+
+        with self.assertRaises(pickle.PicklingError):
+            pickle.dumps(local_func)
+
+    def test_wrapper_attributes(self):
+        self.assertEqual(square_with_pid.__name__, "square_with_pid")
+        self.assertEqual(square_with_pid.__qualname__, "square_with_pid")
+        self.assertEqual(square_with_pid.__module__, "checkpoint_slave")
+        self.assertEqual(Bar.double.__qualname__, "Bar.double")
+
+    def test_process_pool(self):
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            results = list(pool.map(square_with_pid, [1, 2]))
+        self.assertEqual([r[0] for r in results], [1, 4])
+        self.assertNotIn(os.getpid(), [r[1] for r in results])
+
+        # The checkpoints written by the workers are shared with the main process
+        self.assertEqual(square_with_pid(2), results[1])
+
+    def test_map_process(self):
+        results = square_with_pid.map([3, 4], executor="process", max_workers=2)
+        self.assertEqual([r[0] for r in results], [9, 16])
+        self.assertNotIn(os.getpid(), [r[1] for r in results])
+        self.assertEqual(square_with_pid.map([3, 4]), results)
+
+    def test_starmap_process(self):
+        args = [(([1], 0), ([2], 0)), (([3], 0), ([4], 0)), (([1], 0), ([2], 0))]
+        results = sum_with_pid.starmap(args, executor="process", max_workers=2)
+        self.assertEqual([r[0] for r in results], [3, 7, 3])
+        self.assertNotIn(os.getpid(), [r[1] for r in results])
+        self.assertEqual(results[0], results[2])
+
+    def test_map_process_local_function(self):
+        @checkpoint
+        def local_square(x):
+            R()
+            return x * x
+
+        with self.assertRaises(pickle.PicklingError):
+            local_square.map([1, 2], executor="process")
+        self.not_runned()
+
+        self.assertEqual(local_square.map([1, 2], executor="thread"), [1, 4])
+
+    def test_coroutine(self):
+        self.assertEqual(asyncio.run(async_adding(1, 2)), 3)
+        self.runned()
+
+        self.assertEqual(asyncio.run(async_adding(1, 2)), 3)
+        self.not_runned()
+
+        self.assertEqual(asyncio.run(async_adding(1, 2, __recompute__=True)), 3)
+        self.runned()
+
+    def test_coroutine_deduplicated(self):
+        async def main():
+            return await asyncio.gather(async_adding(1, 2), async_adding(1, 2), async_adding(2, 2))
+
+        self.assertEqual(asyncio.run(main()), [3, 3, 4])
+        self.runned_times(2)
+
+        self.assertEqual(asyncio.run(main()), [3, 3, 4])
+        self.not_runned()
+
+    def test_coroutine_map(self):
+        with self.assertRaises(TypeError):
+            async_adding.starmap([(1, 2)])
+
+    def test_rowwise(self):
+        df = pd.DataFrame({"a": range(5), "b": range(5, 10)})
+        self.assertTrue((rowwise_double(df) == df * 2).all().all())
+        self.runned_times(3)
+
+        self.assertTrue((rowwise_double(df) == df * 2).all().all())
+        self.not_runned()
+
+        # Only the last incomplete block and the new block are computed
+        df = pd.DataFrame({"a": range(7), "b": range(5, 12)})
+        self.assertTrue((rowwise_double(df) == df * 2).all().all())
+        self.runned_times(2)
+
+        df.iloc[0, 0] = 100
+        self.assertTrue((rowwise_double(df) == df * 2).all().all())
+        self.runned()
+
+        self.assertTrue((rowwise_double(df, factor=3) == df * 3).all().all())
+        self.runned_times(4)
+
+    def test_rowwise_ndarray(self):
+        arr = np.arange(10).reshape(5, 2)
+        self.assertTrue((rowwise_double(arr) == arr * 2).all())
+        self.runned_times(3)
+
+        self.assertTrue((rowwise_double(np.arange(12).reshape(6, 2)) == np.arange(12).reshape(6, 2) * 2).all())
+        self.runned()
+
+    def test_rowwise_default(self):
+        self.assertListEqual(rowwise_scale().tolist(), [0, 2, 4, 6, 8])
+        self.runned_times(3)
+
+        self.assertListEqual(rowwise_scale(data=np.arange(5)).tolist(), [0, 2, 4, 6, 8])
+        self.not_runned()
+
+    def test_rowwise_wrong_usage(self):
+        with self.assertRaises(ValueError):
+            @checkpoint(rowwise="x")
+            def foo(df):
+                return df
+
+        with self.assertRaises(TypeError):
+            rowwise_double([1, 2, 3])
+
+    def test_background_refresh(self):
+        external_state["value"] = 1
+        self.assertEqual(read_external_state("value"), 1)
+        self.runned()
+
+        external_state["value"] = 2
+        self.assertEqual(read_external_state("value"), 1)
+        read_external_state.wait_refresh()
+        self.runned()
+
+        self.assertEqual(read_external_state("value"), 2)
+        read_external_state.wait_refresh()
+        self.runned()
+
+    def test_background_refresh_after(self):
+        external_state["value"] = 1
+        self.assertEqual(read_external_state_refreshed_later("value"), 1)
+        self.runned()
+
+        # The checkpoint is newer than refresh_after
+        external_state["value"] = 2
+        self.assertEqual(read_external_state_refreshed_later("value"), 1)
+        read_external_state_refreshed_later.wait_refresh()
+        self.not_runned()
+
+    def test_background_refresh_snapshot(self):
+        external_state["value"] = 0
+        values = [1, 2]
+        self.assertEqual(sum_with_external_state(values), 3)
+        self.runned()
+
+        external_state["value"] = 10
+        self.assertEqual(sum_with_external_state(values), 3)
+        values.append(100)
+        sum_with_external_state.wait_refresh()
+        self.runned()
+
+        # Refreshed with the arguments at the time of the call
+        self.assertEqual(sum_with_external_state([1, 2]), 13)
+        sum_with_external_state.wait_refresh()
+
+    def test_max_staleness(self):
+        external_state["value"] = 1
+        self.assertEqual(read_external_state_with_staleness("value"), 1)
+        self.runned()
+
+        external_state["value"] = 2
+        self.assertEqual(read_external_state_with_staleness("value"), 1)
+        self.not_runned()
+
+        time.sleep(0.6)
+        self.assertEqual(read_external_state_with_staleness("value"), 2)
+        self.runned()
+
+    def test_wrong_refresh(self):
+        with self.assertRaises(ValueError):
+            checkpoint(refresh="sometimes")
+
+        with self.assertRaises(ValueError):
+            @checkpoint(refresh="background")
+            def some_generator():
+                yield 0
+
+    def test_adaptive_admission(self):
+        for i in range(3):
+            cheap_but_large(i)
+        self.assertFalse(cheap_but_large.admission.admit)
+        n_files = len(os.listdir(".Lutil-checkpoint"))
+
+        cheap_but_large(3)
+        self.assertEqual(len(os.listdir(".Lutil-checkpoint")), n_files)
+        self.assertEqual(cheap_but_large.admission.n_computes, 4)
+
+        for i in range(4):
+            expensive_but_small(i)
+        self.assertTrue(expensive_but_small.admission.admit)
+        self.assertEqual(len(os.listdir(".Lutil-checkpoint")), n_files + 4)
+
+        expensive_but_small(0)
+        self.assertEqual(expensive_but_small.admission.n_loads, 1)
+        self.assertTrue(expensive_but_small.admission.admit)
+
+    def test_wrong_admission(self):
+        with self.assertRaises(ValueError):
+            checkpoint(admission="never")
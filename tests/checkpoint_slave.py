@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+
+from Lutil.checkpoints import checkpoint
+
+
+@checkpoint
+def square_with_pid(a):
+    return a * a, os.getpid()
+
+
+class Bar(object):
+    @checkpoint
+    def double(self, a):
+        return a * 2
+
+
+@checkpoint
+def make_zeros(n):
+    return np.zeros(n)
+
+
+def is_loaded_from_cache_server(n):
+    from Lutil.checkpoints._cache_server import _cache_client
+
+    hits = _cache_client.hits
+    make_zeros(n)
+    return _cache_client.hits == hits + 1
+
+
+def range_with_pid(n):
+    return list(range(n)), os.getpid()
+
+
+@checkpoint
+def sum_with_pid(a, b):
+    return sum(a[0]) + sum(b[0]), os.getpid()
+
+
+class MeanRegressor(object):
+    def __init__(self, shift=0):
+        self.shift = shift
+
+    def get_params(self, deep=True):
+        return {"shift": self.shift}
+
+    def fit(self, X, y):
+        self.mean_ = np.mean(y) + self.shift
+        self.pid_ = os.getpid()
+        return self
+
+    def predict(self, X):
+        return np.full(len(X), self.mean_)
+
+    def score(self, X, y):
+        return -np.abs(self.predict(X) - y).mean()
@@ -50,6 +50,10 @@ class CheckpointBaseTest(unittest.TestCase):
         self.assertEqual(self.M.getvalue(), RM)
         self.clear()
 
+    def runned_times(self, n):
+        self.assertEqual(self.M.getvalue(), RM * n)
+        self.clear()
+
     def not_runned(self):
         self.assertEqual(self.M.getvalue(), "")
         self.clear()
@@ -0,0 +1,81 @@
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from Lutil.checkpoints import cross_validate
+
+from checkpoint_test_base import R, CheckpointBaseTest
+from checkpoint_slave import MeanRegressor
+
+try:
+    import sklearn
+except ImportError:
+    sklearn = None
+
+
+class PrintingRegressor(MeanRegressor):
+    def fit(self, X, y):
+        R()
+        return super().fit(X, y)
+
+
+class FailingRegressor(PrintingRegressor):
+    def fit(self, X, y):
+        if len(X) < 3:
+            raise RuntimeError("Too few rows.")
+        return super().fit(X, y)
+
+
+def folds(n, k):
+    rows = np.arange(n)
+    return [(np.setdiff1d(rows, test), test) for test in np.array_split(rows, k)]
+
+
+class CrossValidateTest(CheckpointBaseTest):
+    X = pd.DataFrame({"a": np.arange(12)})
+    y = np.arange(12.0)
+
+    def test_cache_folds(self):
+        res = cross_validate(PrintingRegressor(), self.X, self.y, cv=folds(12, 3), executor="thread")
+        self.runned_times(3)
+        self.assertEqual(len(res["test_score"]), 3)
+        self.assertEqual(res["estimator"][0].mean_, np.mean(self.y[4:]))
+        self.assertTrue((res["predictions"][0] == np.mean(self.y[4:])).all())
+
+        res2 = cross_validate(PrintingRegressor(), self.X, self.y, cv=folds(12, 3), executor="thread")
+        self.not_runned()
+        self.assertTrue((res["test_score"] == res2["test_score"]).all())
+
+        cross_validate(PrintingRegressor(), self.X, self.y, cv=folds(12, 4), executor="thread")
+        self.runned_times(4)
+
+        cross_validate(PrintingRegressor(shift=1), self.X, self.y, cv=folds(12, 3), executor="thread")
+        self.runned_times(3)
+
+        cross_validate(PrintingRegressor(), self.X, self.y + 1, cv=folds(12, 3), executor="thread")
+        self.runned_times(3)
+
+    def test_resume(self):
+        cv = folds(12, 3) + [(np.arange(2), np.arange(2, 12))]
+        with self.assertRaises(RuntimeError):
+            cross_validate(FailingRegressor(), self.X, self.y, cv=cv, executor="thread")
+        self.runned_times(3)
+
+        res = cross_validate(FailingRegressor(), self.X, self.y, cv=folds(12, 3), executor="thread")
+        self.not_runned()
+        self.assertEqual(len(res["test_score"]), 3)
+
+    def test_process_pool(self):
+        res = cross_validate(MeanRegressor(), self.X, self.y, cv=folds(12, 3), scoring=None)
+        self.assertNotEqual(res["estimator"][0].pid_, os.getpid())
+        res2 = cross_validate(MeanRegressor(), self.X, self.y, cv=folds(12, 3))
+        self.assertEqual([i.pid_ for i in res["estimator"]], [i.pid_ for i in res2["estimator"]])
+
+    @unittest.skipIf(sklearn is None, "scikit-learn is not installed")
+    def test_sklearn(self):
+        from sklearn.linear_model import Ridge
+
+        res = cross_validate(Ridge(), self.X, self.y, cv=3, scoring="neg_mean_squared_error")
+        self.assertEqual(len(res["test_score"]), 3)
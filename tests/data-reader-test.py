@@ -1,11 +1,52 @@
+import concurrent.futures
+import threading
+import time
 import unittest
+from unittest import mock
+from Lutil import dataIO
 from Lutil.dataIO import DataReader
 import logging
+import os
+import shutil
 import pandas as pd
 from singleton_slave_1 import get_reader_1
 from singleton_slave_2 import get_reader_2
 from Lutil._exceptions import DuplicateSettingWarning
 
+read_calls = []
+
+
+def count_read_csv(path, **kwargs):
+    read_calls.append(path)
+    return pd.read_csv(path, **kwargs)
+
+
+def slow_read_csv(path, **kwargs):
+    read_calls.append(("slow", path))
+    time.sleep(0.2)
+    return pd.read_csv(path, **kwargs)
+
+
+read_barrier = None
+
+
+def concurrent_read_csv(path, **kwargs):
+    # Only returns if the other read is running at the same time
+    read_calls.append(("concurrent", path))
+    if read_barrier is not None:
+        read_barrier.wait()
+    return pd.read_csv(path, **kwargs)
+
+
+def read_csv_ignoring_chunksize(path, chunksize=None, **kwargs):
+    return pd.read_csv(path, **kwargs)
+
+
+def read_csv_failing(path, chunksize=None, **kwargs):
+    yield pd.read_csv(path, nrows=1, **kwargs)
+    raise OSError("Failed to read.")
+
+
 # Some assertWarns are commented due to a bug
 # in assertWarns https://bugs.python.org/issue29620
 
@@ -228,3 +269,186 @@ class DataReaderTest(unittest.TestCase):
 
         reader.train_path = self.path1
         _ = reader.train()
+
+    def test_cache_dir(self):
+        _id = "test_cache_dir"
+        cache_dir = os.path.join("tests", "data-reader-cache")
+        data_path = os.path.join(cache_dir, "data.csv")
+        os.makedirs(cache_dir, exist_ok=True)
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        shutil.copy(self.path2, data_path)
+
+        reader = DataReader(data_path, _id=_id, read_func=count_read_csv, cache_dir=cache_dir, index_col="car")
+        expected = pd.read_csv(data_path, index_col="car")
+        pd.testing.assert_frame_equal(reader.train(), expected)
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+        # Loaded from the sidecar file
+        calls = len(read_calls)
+        pd.testing.assert_frame_equal(reader.train(), expected)
+        self.assertEqual(len(read_calls), calls)
+
+        with self.assertRaises(ValueError):
+            _ = DataReader(_id=_id, cache_dir="some_else")
+
+        with open(data_path, "a") as f:
+            f.write("9,9,9,9,9\n")
+        stat = os.stat(data_path)
+        os.utime(data_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        changed = reader.train()
+        self.assertEqual(len(read_calls), calls + 1)
+        self.assertEqual(len(changed), len(expected) + 1)
+        # The sidecar of the previous version is removed
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+    def test_memoize(self):
+        _id = "test_memoize"
+        data_dir = os.path.join("tests", "data-reader-memo")
+        data_path = os.path.join(data_dir, "data.csv")
+        os.makedirs(data_dir, exist_ok=True)
+        self.addCleanup(shutil.rmtree, data_dir, ignore_errors=True)
+        shutil.copy(self.path1, data_path)
+
+        reader = DataReader(data_path, _id=_id, read_func=count_read_csv, memoize=True)
+        calls = len(read_calls)
+        train_1 = reader.train()
+        train_2 = DataReader(_id=_id).train()
+        self.assertEqual(len(read_calls), calls + 1)
+        self.assertTrue(train_1 is not train_2)
+        pd.testing.assert_frame_equal(train_1, train_2)
+
+        # Modifying the returned data does not affect the memoized one
+        train_1.iloc[0, 0] = -1
+        pd.testing.assert_frame_equal(reader.train(), pd.read_csv(data_path))
+
+        _ = DataReader(self.path1, _id=_id + "_disabled")
+        with self.assertRaises(ValueError):
+            _ = DataReader(_id=_id + "_disabled", memoize=True)
+
+        with open(data_path, "a") as f:
+            f.write("\n1,2,3,4")
+        stat = os.stat(data_path)
+        os.utime(data_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(len(reader.train()), len(train_2) + 1)
+        self.assertEqual(len(read_calls), calls + 2)
+
+    def test_memoize_single_flight(self):
+        _id = "test_memoize_single_flight"
+        reader = DataReader(self.path1, _id=_id, read_func=slow_read_csv, memoize=True)
+        with concurrent.futures.ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(lambda _: reader.train(), range(8)))
+        self.assertEqual(read_calls.count(("slow", self.path1)), 1)
+        for res in results:
+            pd.testing.assert_frame_equal(res, pd.read_csv(self.path1))
+
+    def test_iter_chunks(self):
+        _id = "test_iter_chunks"
+        # The types of the mixed columns in data3 are inferred chunk by chunk
+        reader = DataReader(self.path1, self.path2, self.path2, _id=_id)
+        for path, iter_func in [
+            (self.path1, reader.iter_train),
+            (self.path2, reader.iter_test),
+            (self.path2, reader.iter_val),
+        ]:
+            expected = pd.read_csv(path)
+            for prefetch in [0, 2]:
+                chunks = list(iter_func(2, prefetch=prefetch))
+                self.assertTrue(all(len(i) <= 2 for i in chunks))
+                self.assertEqual(len(chunks), (len(expected) + 1) // 2)
+                pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+
+        with self.assertRaises(ValueError):
+            _ = reader.iter_train(0)
+
+    def test_iter_chunks_without_chunk_support(self):
+        _id = "test_iter_chunks_without_chunk_support"
+        reader = DataReader(self.path1, _id=_id, read_func=read_csv_ignoring_chunksize)
+        with self.assertLogs(level=logging.WARNING):
+            chunks = list(reader.iter_train(3))
+        pd.testing.assert_frame_equal(pd.concat(chunks), pd.read_csv(self.path1))
+
+    def test_iter_chunks_prefetch(self):
+        _id = "test_iter_chunks_prefetch"
+        reader = DataReader(self.path1, _id=_id)
+        threads = threading.active_count()
+        iterator = reader.iter_train(1, prefetch=1)
+        first = next(iterator)
+        self.assertEqual(len(first), 1)
+        iterator.close()
+        self.assertEqual(threading.active_count(), threads)
+
+        reader = DataReader(self.path1, _id=_id + "_error", read_func=read_csv_failing)
+        with self.assertRaises(OSError):
+            _ = list(reader.iter_train(1, prefetch=1))
+
+    def test_read_all(self):
+        _id = "test_read_all"
+        reader = DataReader(self.path1, self.path2, _id=_id, read_func=count_read_csv)
+        calls = len(read_calls)
+        res = reader.read_all()
+        self.assertListEqual(list(res), ["train", "test"])
+        pd.testing.assert_frame_equal(res["train"], pd.read_csv(self.path1))
+        pd.testing.assert_frame_equal(res["test"], pd.read_csv(self.path2))
+        self.assertEqual(len(read_calls), calls + 2)
+
+        res = DataReader(self.path1, self.path2, self.path3, _id=_id + "_process").read_all(executor="process")
+        pd.testing.assert_frame_equal(res["val"], pd.read_csv(self.path3))
+
+        with self.assertRaises(ValueError):
+            _ = reader.read_all(executor="unknown")
+
+    def test_prefetch(self):
+        global read_barrier
+        _id = "test_prefetch"
+        reader = DataReader(self.path1, self.path2, _id=_id, read_func=concurrent_read_csv)
+        # Both are read at the same time
+        read_barrier = threading.Barrier(2, timeout=30)
+        try:
+            reader.prefetch()
+            train, test = reader.train(), reader.test()
+        finally:
+            read_barrier = None
+        pd.testing.assert_frame_equal(train, pd.read_csv(self.path1))
+        pd.testing.assert_frame_equal(test, pd.read_csv(self.path2))
+
+        # The prefetched data is used only once without memoization
+        calls = read_calls.count(("concurrent", self.path1))
+        _ = reader.train()
+        self.assertEqual(read_calls.count(("concurrent", self.path1)), calls + 1)
+
+    def test_prefetch_expired(self):
+        _id = "test_prefetch_expired"
+        reader = DataReader(self.path1, _id=_id, read_func=count_read_csv)
+        prefetched = reader._DataReader__prefetched
+        with mock.patch.object(dataIO, "_prefetched_ttl", 0):
+            reader.prefetch()
+            for _ in range(300):
+                if not prefetched:
+                    break
+                time.sleep(0.1)
+        # The unused data is released
+        self.assertDictEqual(prefetched, {})
+
+        calls = read_calls.count(self.path1)
+        _ = reader.train()
+        self.assertEqual(read_calls.count(self.path1), calls + 1)
+
+    def test_speculate(self):
+        global read_barrier
+        _id = "test_speculate"
+        reader = DataReader(self.path1, self.path2, _id=_id, read_func=concurrent_read_csv, speculate=True)
+        calls = read_calls.count(("concurrent", self.path2))
+        # The test set is read at the same time as the train set
+        read_barrier = threading.Barrier(2, timeout=30)
+        try:
+            _ = reader.train()
+        finally:
+            read_barrier = None
+        test = reader.test()
+        self.assertEqual(read_calls.count(("concurrent", self.path2)), calls + 1)
+        pd.testing.assert_frame_equal(test, pd.read_csv(self.path2))
+
+        _ = DataReader(self.path1, _id=_id + "_disabled")
+        with self.assertRaises(ValueError):
+            _ = DataReader(_id=_id + "_disabled", speculate=True)
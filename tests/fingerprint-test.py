@@ -0,0 +1,100 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import Lutil.checkpoints._check_util as check_util
+from Lutil.checkpoints import Fingerprint
+
+
+class FingerprintTest(unittest.TestCase):
+    def setUp(self):
+        self.block_size = check_util._block_size
+        check_util._block_size = 4
+
+    def tearDown(self):
+        check_util._block_size = self.block_size
+
+    def test_blocks(self):
+        df = pd.DataFrame({"a": range(10), "b": range(10, 20)})
+        fp = Fingerprint(df)
+        self.assertEqual(len(fp.blocks), 3)
+        self.assertEqual(fp.length, 10)
+        self.assertEqual(fp.root, Fingerprint(df.copy()).root)
+
+        small = df.iloc[:3]
+        self.assertEqual(Fingerprint(small).root, Fingerprint(small).blocks[0])
+
+    def test_update(self):
+        df = pd.DataFrame({"a": range(10), "b": range(10, 20)})
+        fp = Fingerprint(df)
+        old_blocks = list(fp.blocks)
+
+        df.iloc[5, 0] = 100
+        fp.update(df, rows=[5])
+        self.assertEqual(fp.blocks, Fingerprint(df).blocks)
+        self.assertEqual(fp.blocks[0], old_blocks[0])
+        self.assertNotEqual(fp.blocks[1], old_blocks[1])
+
+        df = pd.concat([df, pd.DataFrame({"a": [1, 2, 3], "b": [4, 5, 6]}, index=[10, 11, 12])])
+        fp.update(df)
+        self.assertEqual(fp.blocks, Fingerprint(df).blocks)
+        self.assertEqual(fp.root, Fingerprint(df).root)
+
+        df = df.iloc[:5]
+        fp.update(df)
+        self.assertEqual(fp.blocks, Fingerprint(df).blocks)
+
+    def test_ndarray(self):
+        arr = np.arange(20).reshape(10, 2)
+        fp = Fingerprint(arr)
+        arr[9, 1] = -1
+        fp.update(arr, rows=[9])
+        self.assertEqual(fp.blocks, Fingerprint(arr).blocks)
+
+    def test_diff(self):
+        df1 = pd.DataFrame({"a": range(10)})
+        df2 = df1.copy()
+        df2.iloc[1, 0] = -1
+        df2.iloc[5, 0] = -1
+        self.assertEqual(Fingerprint(df1).diff(Fingerprint(df2)), [(0, 8)])
+
+        df3 = pd.DataFrame({"a": range(14)})
+        self.assertEqual(Fingerprint(df1).diff(Fingerprint(df3)), [(8, 14)])
+        self.assertEqual(Fingerprint(df1).diff(Fingerprint(df1)), [])
+
+    def test_attach(self):
+        df = pd.DataFrame({"a": range(10)})
+        fp = Fingerprint(df).attach(df)
+        self.assertIs(Fingerprint.of(df), fp)
+        self.assertEqual(check_util._hash_pd_object(df), fp.root)
+
+        self.assertIsNot(Fingerprint.of(df.copy()), fp)
+
+        with self.assertRaises(ValueError):
+            fp.attach(df.iloc[:3])
+
+    def test_update_all(self):
+        df = pd.DataFrame({"a": range(10)})
+        fp = Fingerprint(df)
+        df.iloc[3, 0] = 1000
+        fp.update(df)
+        self.assertEqual(fp.blocks, Fingerprint(df).blocks)
+
+    def test_attach_modified(self):
+        df = pd.DataFrame({"a": range(10)})
+        fp = Fingerprint(df).attach(df)
+        old_root = fp.root
+
+        # Modified without updating the fingerprint
+        df.iloc[3, 0] = 1000
+        self.assertIsNot(Fingerprint.of(df), fp)
+        self.assertNotEqual(check_util._hash_pd_object(df), old_root)
+
+        fp.update(df, rows=[3])
+        self.assertIs(Fingerprint.of(df), fp)
+        self.assertEqual(check_util._hash_pd_object(df), Fingerprint(df).root)
+
+    def test_unsupported(self):
+        with self.assertRaises(TypeError):
+            Fingerprint([1, 2, 3])
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+heavy_modules = ["pandas", "numpy", "joblib", "chardet", "asyncio", "multiprocessing.connection", "tempfile"]
+
+
+def run_python(code, cwd=None, *options):
+    env = dict(os.environ, PYTHONPATH=root)
+    res = subprocess.run(
+        [sys.executable, *options, "-c", code], cwd=cwd, env=env, capture_output=True, text=True, check=True
+    )
+    return res.stdout, res.stderr
+
+
+class ImportTest(unittest.TestCase):
+    def test_no_heavy_modules(self):
+        out, _ = run_python(
+            "import sys, Lutil.checkpoints, Lutil.dataIO\n"
+            f"print([i for i in {heavy_modules} if i in sys.modules])"
+        )
+        self.assertEqual(out.strip(), "[]")
+
+    def test_scalar_checkpoint(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            code = (
+                "import sys\n"
+                "from Lutil.checkpoints import checkpoint\n"
+                "@checkpoint\n"
+                "def add(a, b):\n"
+                "    return a + b\n"
+                "assert add(1, 2) == 3 and add(1, 2) == 3\n"
+                "print('pandas' in sys.modules)"
+            )
+            with open(os.path.join(tmp_dir, "script.py"), "w") as f:
+                f.write(code)
+            out, _ = run_python("import runpy; runpy.run_path('script.py', run_name='__main__')", tmp_dir)
+        self.assertEqual(out.strip(), "False")
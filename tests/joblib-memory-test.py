@@ -0,0 +1,156 @@
+import datetime
+import os
+import pickle
+import unittest
+import warnings
+
+import numpy as np
+
+from Lutil._exceptions import ComplexParamsIdentifyWarning
+from Lutil.checkpoints import Memory
+
+from checkpoint_test_base import R, CheckpointBaseTest
+
+try:
+    import sklearn
+except ImportError:
+    sklearn = None
+
+
+class Scaler(object):
+    def __init__(self, factor=1, offset=0):
+        self.factor = factor
+        self.offset = offset
+
+    def get_params(self, deep=True):
+        return {"factor": self.factor, "offset": self.offset}
+
+    def fit(self, X):
+        self.mean_ = X.mean()
+        return self
+
+    def transform(self, X):
+        return (X - self.mean_) * self.factor + self.offset
+
+
+def fit_transform_one(transformer, X, y=None):
+    R()
+    res = transformer.fit(X).transform(X)
+    return res, transformer
+
+
+def fit_transform_with_params(transformer, X, y=None, message=None, **fit_params):
+    # The signature of the function cached by sklearn.pipeline.Pipeline
+    R()
+    res = transformer.fit(X).transform(X)
+    return res, transformer
+
+
+def scale(transformer, X):
+    R()
+    return transformer.transform(X)
+
+
+class JoblibMemoryTest(CheckpointBaseTest):
+    def test_cache(self):
+        memory = Memory()
+        cached = memory.cache(fit_transform_one)
+        X = np.arange(10.0)
+
+        res, fitted = cached(Scaler(2), X)
+        self.runned()
+        self.assertEqual(fitted.mean_, 4.5)
+
+        res2, fitted2 = cached(Scaler(2), X)
+        self.not_runned()
+        self.assertTrue((res == res2).all())
+        self.assertEqual(fitted2.mean_, 4.5)
+
+        cached(Scaler(3), X)
+        self.runned()
+
+        cached(Scaler(2), X + 1)
+        self.runned()
+
+    def test_fitted_estimator(self):
+        cached = Memory().cache(scale)
+        X = np.arange(10.0)
+        cached(Scaler().fit(X), X)
+        self.runned()
+        cached(Scaler().fit(X), X)
+        self.not_runned()
+        cached(Scaler().fit(X + 1), X)
+        self.runned()
+
+    def test_memorized_func(self):
+        memory = Memory()
+        cached = memory.cache(ignore=["y"])(fit_transform_one)
+        X = np.arange(10.0)
+
+        self.assertFalse(cached.check_call_in_cache(Scaler(), X))
+        result = cached.call_and_shelve(Scaler(), X, y=1)
+        self.runned()
+        self.assertTrue(cached.check_call_in_cache(Scaler(), X, y=2))
+        self.assertEqual(result.get()[1].mean_, 4.5)
+        self.not_runned()
+
+        cached.call(Scaler(), X)
+        self.runned()
+
+        cached = pickle.loads(pickle.dumps(cached))
+        cached(Scaler(), X)
+        self.not_runned()
+
+        memory.eval(fit_transform_one, Scaler(), X)
+        self.runned()
+        memory.eval(fit_transform_one, Scaler(), X)
+        self.not_runned()
+
+        cached.clear()
+        self.assertFalse(cached.check_call_in_cache(Scaler(), X))
+
+    def test_var_keyword(self):
+        cached = Memory().cache(fit_transform_with_params)
+        X = np.arange(10.0)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            cached(Scaler(), X)
+            self.runned()
+            cached(Scaler(), X)
+            self.not_runned()
+        self.assertFalse([i for i in caught if issubclass(i.category, ComplexParamsIdentifyWarning)])
+
+        cached(Scaler(), X, sample_weight=1)
+        self.runned()
+        cached(Scaler(), X, sample_weight=2)
+        self.runned()
+
+    def test_reduce_size(self):
+        memory = Memory()
+        cached = memory.cache(fit_transform_one)
+        for i in range(3):
+            cached(Scaler(i), np.arange(10.0))
+        self.runned_times(3)
+
+        memory.reduce_size(items_limit=2)
+        self.assertEqual(sum(cached.check_call_in_cache(Scaler(i), np.arange(10.0)) for i in range(3)), 2)
+        memory.reduce_size(age_limit=datetime.timedelta(seconds=-1))
+        self.assertEqual(sum(cached.check_call_in_cache(Scaler(i), np.arange(10.0)) for i in range(3)), 0)
+
+        cached(Scaler(), np.arange(10.0))
+        memory.clear()
+        self.assertEqual([i for i in os.listdir(memory.location) if i.endswith(".pkl")], [])
+
+    @unittest.skipIf(sklearn is None, "scikit-learn is not installed")
+    def test_sklearn_pipeline(self):
+        from sklearn.decomposition import PCA
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import Pipeline
+
+        X = np.random.RandomState(0).rand(20, 3)
+        y = np.arange(20) % 2
+        pipeline = Pipeline([("pca", PCA(2)), ("clf", LogisticRegression())], memory=Memory())
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", ComplexParamsIdentifyWarning)
+            pred = pipeline.fit(X, y).predict(X)
+        self.assertTrue((pipeline.fit(X, y).predict(X) == pred).all())
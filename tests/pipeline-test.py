@@ -0,0 +1,103 @@
+import os
+import threading
+
+from Lutil.checkpoints import checkpoint, Pipeline
+
+from checkpoint_test_base import R, CheckpointBaseTest
+from checkpoint_slave import range_with_pid, sum_with_pid
+
+
+@checkpoint
+def load(n):
+    R()
+    return list(range(n))
+
+
+def double(data):
+    R()
+    return [i * 2 for i in data]
+
+
+def total(a, b):
+    R()
+    return sum(a) + sum(b)
+
+
+barrier = None
+
+
+def meet(n):
+    # Only passes if all the stages are running at the same time
+    barrier.wait()
+    return n
+
+
+def build(n=3):
+    return (
+        Pipeline()
+        .add("raw", load, n=n)
+        .add("double", double, depends=["raw"])
+        .add("total", total, depends=["raw", "double"])
+    )
+
+
+class PipelineTest(CheckpointBaseTest):
+    def test_run(self):
+        self.assertEqual(build().run(executor="thread"), {"total": 9})
+        self.runned_times(3)
+
+        self.assertEqual(build().run(executor="thread"), {"total": 9})
+        self.not_runned()
+
+        self.assertEqual(build().run(["double"], executor="thread"), {"double": [0, 2, 4]})
+        self.not_runned()
+
+        self.assertEqual(build(4).run(executor="thread"), {"total": 18})
+        self.runned_times(3)
+
+    def test_skip_cached_upstream(self):
+        build().run(["double"], executor="thread")
+        self.runned_times(2)
+
+        pipeline = build()
+        self.assertEqual(pipeline.plan()[0], ["total"])
+        # The output of raw is loaded for total, while double is not loaded
+        self.assertEqual(pipeline.run(executor="thread"), {"total": 9})
+        self.runned()
+
+        self.assertEqual(build().plan()[0], [])
+
+    def test_parallel(self):
+        global barrier
+        barrier = threading.Barrier(3, timeout=30)
+        pipeline = Pipeline().add("a", meet, n=1).add("b", meet, n=2).add("c", meet, n=3)
+        self.assertEqual(pipeline.run(executor="thread", max_workers=3), {"a": 1, "b": 2, "c": 3})
+
+    def test_process_pool(self):
+        pipeline = (
+            Pipeline()
+            .add("a", range_with_pid, n=3)
+            .add("b", range_with_pid, n=4)
+            .add("total", sum_with_pid, depends=["a", "b"])
+        )
+        res, pid = pipeline.run()["total"]
+        self.assertEqual(res, 9)
+        self.assertNotEqual(pid, os.getpid())
+
+        self.assertEqual(pipeline.run()["total"], (res, pid))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Pipeline().add("a", double, depends=["b"]).run()
+
+        with self.assertRaises(ValueError):
+            Pipeline().add("a", double, depends=["b"]).add("b", double, depends=["a"]).run()
+
+        with self.assertRaises(ValueError):
+            Pipeline().add("a", double).add("a", double)
+
+        with self.assertRaises(ValueError):
+            Pipeline().add("a", checkpoint(rowwise="data")(double))
+
+        with self.assertRaises(ValueError):
+            build().run(["foo"])
@@ -0,0 +1,139 @@
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import Lutil.checkpoints._check_util as check_util
+from Lutil.checkpoints import checkpoint, enable_provenance
+
+from checkpoint_test_base import R, CheckpointBaseTest
+
+
+@checkpoint
+def make_frame(n):
+    R()
+    return pd.DataFrame({"a": np.arange(n), "b": np.arange(n) * 2.0})
+
+
+@checkpoint
+def make_array(n):
+    R()
+    return np.arange(n)
+
+
+@checkpoint
+def total(df):
+    R()
+    return np.asarray(df).sum()
+
+
+@checkpoint
+def identity(df):
+    R()
+    return df
+
+
+@checkpoint
+def head(df):
+    R()
+    return df.iloc[:2]
+
+
+class ProvenanceTest(CheckpointBaseTest):
+    def setUp(self):
+        super().setUp()
+        enable_provenance()
+
+    def tearDown(self):
+        enable_provenance(False)
+        super().tearDown()
+
+    def test_chain_without_hashing(self):
+        df = make_frame(1000)
+        self.runned()
+
+        with mock.patch.object(check_util.Fingerprint, "of", side_effect=AssertionError):
+            total(df)
+            self.runned()
+            total(make_frame(1000))
+            self.not_runned()
+            total(make_array(1000))
+            self.runned_times(2)
+
+    def test_same_key_when_loaded(self):
+        total(make_frame(100))
+        self.runned_times(2)
+        total(make_frame(100))
+        self.not_runned()
+
+    def test_mutated(self):
+        df = make_frame(100)
+        total(df)
+        self.runned_times(2)
+
+        # The results are read-only, so they cannot be modified in place without dropping the key
+        with self.assertRaises(ValueError):
+            df.iloc[0, 0] = -1
+        df = df.copy()
+        df.iloc[0, 0] = -1
+        self.assertIsNone(check_util._get_provenance(df))
+        total(df)
+        self.runned()
+
+        arr = make_array(100)
+        self.runned()
+        with self.assertRaises(ValueError):
+            arr[50] = -1
+        arr.flags.writeable = True
+        self.assertIsNone(check_util._get_provenance(arr))
+
+        df = make_frame(100)
+        df["c"] = 0
+        self.assertIsNone(check_util._get_provenance(df))
+
+    def test_mutated_unsampled_row(self):
+        df = make_frame(100000)
+        self.assertEqual(total(df), 4999950000 * 3)
+        self.runned_times(2)
+
+        # Not one of the rows sampled by the guard
+        self.assertNotIn(5, np.linspace(0, len(df) - 1, num=check_util._n_guard_rows, dtype=int))
+        with self.assertRaises(ValueError):
+            df.iloc[5, 0] = 10 ** 9
+
+        arr = make_array(100000)
+        with self.assertRaises(ValueError):
+            arr[5] = 10 ** 9
+
+    def test_disabled_by_default(self):
+        enable_provenance(False)
+        df = make_frame(100000)
+        self.assertEqual(total(df), 4999950000 * 3)
+        self.runned_times(2)
+        self.assertTrue(df["a"].values.flags.writeable)
+
+        df.iloc[5, 0] = 10 ** 9
+        self.assertEqual(total(df), 4999950000 * 3 + 10 ** 9 - 5)
+        self.runned()
+
+    def test_view(self):
+        data = np.arange(100)
+        view = data[10:]
+        check_util._tag_provenance(view, "some-key")
+        self.assertEqual(check_util._get_provenance(view), "some-key")
+        # The view could be modified through its base
+        with self.assertRaises(ValueError):
+            data[20] = -1
+
+    def test_view_of_input(self):
+        df = pd.DataFrame({"x": np.arange(10.0)})
+        res = head(df)
+        self.runned()
+        # The input of the caller is not made read-only through the result
+        df.loc[0, "x"] = 5
+        self.assertEqual(df.loc[0, "x"], 5)
+        self.assertIsNone(check_util._get_provenance(res))
+
+        arr = np.arange(10)
+        _ = head(pd.Series(arr))
+        arr[0] = -1
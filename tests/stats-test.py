@@ -0,0 +1,139 @@
+import inspect
+import logging
+import tracemalloc
+from unittest import mock
+
+import numpy as np
+
+from Lutil.checkpoints import checkpoint, InlineCheckpoint, stats, reset_stats, enable_memory_probe
+from Lutil.checkpoints import _stats
+from Lutil.checkpoints._stats import _log_stats
+
+from checkpoint_test_base import R, CheckpointBaseTest
+
+
+@checkpoint
+def make_array(n):
+    R()
+    return np.arange(n)
+
+
+@checkpoint
+def make_nested_arrays(n):
+    R()
+    big = np.ones(2 * n)
+    del big
+    return make_array(n)
+
+
+class Foo(object):
+    pass
+
+
+def inline_block(a):
+    f = Foo()
+    with InlineCheckpoint(watch=["a"], produce=["f.b"]):
+        R()
+        f.b = np.arange(a)
+    return f.b
+
+
+class StatsTest(CheckpointBaseTest):
+    def setUp(self):
+        super().setUp()
+        reset_stats()
+
+    def test_function_stats(self):
+        make_array(1000)
+        make_array(1000)
+        make_array(2000)
+        self.runned_times(2)
+
+        s = stats()[f"{__name__}.make_array"]
+        self.assertEqual(s["kind"], "function")
+        self.assertEqual(s["hits"], 1)
+        self.assertEqual(s["misses"], 2)
+        self.assertGreater(s["fingerprint_time"], 0)
+        self.assertGreater(s["compute_time"], 0)
+        self.assertGreater(s["load_time"], 0)
+        self.assertGreater(s["dump_time"], 0)
+        self.assertGreater(s["bytes_written"], 3000 * 8)
+        self.assertGreater(s["bytes_read"], 1000 * 8)
+        self.assertGreaterEqual(s["time_saved"], 0)
+
+    def test_block_stats(self):
+        inline_block(10)
+        inline_block(10)
+        self.runned()
+
+        sourcelines, first_line = inspect.getsourcelines(inline_block)
+        line = first_line + next(i for i, l in enumerate(sourcelines) if "InlineCheckpoint" in l)
+        names = [name for name in stats() if name.startswith("stats-test.py:")]
+        self.assertEqual(names, [f"stats-test.py:{line}"])
+        s = stats()[names[0]]
+        self.assertEqual(s["kind"], "block")
+        self.assertEqual(s["hits"], 1)
+        self.assertEqual(s["misses"], 1)
+        self.assertGreater(s["bytes_read"], 0)
+        self.assertGreater(s["bytes_written"], 0)
+
+    def test_unused_not_listed(self):
+        # Only the records used from now on
+        with mock.patch.dict(_stats._records, clear=True):
+            make_array(10)
+            self.runned()
+            self.assertListEqual(list(stats()), [f"{__name__}.make_array"])
+
+    def test_reset(self):
+        make_array(10)
+        self.runned()
+        reset_stats()
+        self.assertEqual(stats()[f"{__name__}.make_array"]["misses"], 0)
+
+    def test_log(self):
+        make_array(10)
+        self.runned()
+        with self.assertLogs("Lutil", level=logging.INFO) as cm:
+            _log_stats()
+        self.assertIn("make_array", cm.output[0])
+
+    def test_memory_probe(self):
+        enable_memory_probe()
+        try:
+            make_array(100000)
+            make_array(100000)
+            inline_block(100000)
+            self.runned_times(2)
+        finally:
+            enable_memory_probe(False)
+            tracemalloc.stop()
+
+        s = stats()[f"{__name__}.make_array"]
+        self.assertGreaterEqual(s["compute_peak_traced"], 100000 * 8)
+        self.assertGreaterEqual(s["compute_peak_rss"], 0)
+        self.assertTrue(any("stats-test.py" in i for i in s["compute_top_allocators"]))
+        self.assertIn("io_peak_traced", s)
+        self.assertIn("io_top_allocators", s)
+
+        s = stats()[[name for name in stats() if name.startswith("stats-test.py:")][0]]
+        self.assertGreaterEqual(s["compute_peak_traced"], 100000 * 8)
+
+    def test_no_memory_probe(self):
+        make_array(10)
+        self.runned()
+        self.assertNotIn("compute_peak_traced", stats()[f"{__name__}.make_array"])
+
+    def test_nested_memory_probe(self):
+        enable_memory_probe(top=0)
+        try:
+            make_nested_arrays(100000)
+            self.runned_times(2)
+        finally:
+            enable_memory_probe(False)
+            tracemalloc.stop()
+
+        # The inner probe does not reset the peak of the outer one
+        outer = stats()[f"{__name__}.make_nested_arrays"]
+        inner = stats()[f"{__name__}.make_array"]
+        self.assertGreaterEqual(inner["compute_peak_traced"], 100000 * 8)
+        self.assertGreaterEqual(outer["compute_peak_traced"], 2 * 100000 * 8)
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+import Lutil.checkpoints._store as store
+
+from Lutil.checkpoints import checkpoint, InlineCheckpoint, set_shared_dir, wait_replication
+
+from checkpoint_test_base import R, CheckpointBaseTest
+
+save_dir = ".Lutil-checkpoint"
+
+
+@checkpoint
+def square(a):
+    R()
+    return a * a
+
+
+@checkpoint
+def count_to(n):
+    R()
+    for i in range(n):
+        yield i
+
+
+@checkpoint
+async def async_square(a):
+    R()
+    return a * a
+
+
+class Foo(object):
+    pass
+
+
+def inline_square(a):
+    f = Foo()
+    with InlineCheckpoint(watch=["a"], produce=["f.b"]):
+        R()
+        f.b = a * a
+    return f.b
+
+
+class TieredStoreTest(CheckpointBaseTest):
+    def setUp(self):
+        super().setUp()
+        self.shared_dir = tempfile.mkdtemp()
+        set_shared_dir(self.shared_dir)
+
+    def tearDown(self):
+        wait_replication()
+        set_shared_dir(None)
+        shutil.rmtree(self.shared_dir, ignore_errors=True)
+        super().tearDown()
+
+    def drop_local(self):
+        wait_replication()
+        shutil.rmtree(save_dir)
+        os.mkdir(save_dir)
+
+    def test_replicate_to_shared(self):
+        self.assertEqual(square(3), 9)
+        self.runned()
+        wait_replication()
+        self.assertEqual(
+            sorted(os.listdir(self.shared_dir)), sorted(i for i in os.listdir(save_dir) if i.endswith(".pkl"))
+        )
+
+    def test_promote_from_shared(self):
+        square(3)
+        self.runned()
+        self.drop_local()
+
+        self.assertEqual(square(3), 9)
+        self.not_runned()
+        self.assertEqual(len(os.listdir(save_dir)), 1)
+
+        shutil.rmtree(self.shared_dir)
+        self.assertEqual(square(3), 9)
+        self.not_runned()
+
+    def test_local_first(self):
+        square(3)
+        self.runned()
+        wait_replication()
+        for name in os.listdir(self.shared_dir):
+            os.remove(os.path.join(self.shared_dir, name))
+
+        self.assertEqual(square(3), 9)
+        self.not_runned()
+
+    def test_map_promote(self):
+        self.assertEqual(square.map([1, 2]), [1, 4])
+        self.runned_times(2)
+        self.drop_local()
+
+        self.assertEqual(square.map([1, 2, 3]), [1, 4, 9])
+        self.runned()
+
+    def test_generator_promote(self):
+        self.assertEqual(list(count_to(3)), [0, 1, 2])
+        self.runned()
+        self.drop_local()
+
+        self.assertEqual(list(count_to(3)), [0, 1, 2])
+        self.not_runned()
+
+    def test_coroutine_promote(self):
+        self.assertEqual(asyncio.run(async_square(3)), 9)
+        self.runned()
+        self.drop_local()
+
+        copying_threads = []
+        copy = store._copy
+
+        def recording_copy(src, dst):
+            copying_threads.append(threading.get_ident())
+            copy(src, dst)
+
+        # The checkpoint is copied from the shared directory without blocking the event loop
+        with mock.patch.object(store, "_copy", recording_copy):
+            self.assertEqual(asyncio.run(async_square(3)), 9)
+        self.not_runned()
+        self.assertEqual(len(copying_threads), 1)
+        self.assertNotEqual(copying_threads[0], threading.get_ident())
+
+    def test_inline_promote(self):
+        self.assertEqual(inline_square(3), 9)
+        self.runned()
+        self.drop_local()
+
+        self.assertEqual(inline_square(3), 9)
+        self.not_runned()
+
+    def test_without_shared_dir(self):
+        set_shared_dir(None)
+        square(3)
+        self.runned()
+        wait_replication()
+        self.assertEqual(os.listdir(self.shared_dir), [])
@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import tempfile
+
+from Lutil.checkpoints import checkpoint, start_trace, stop_trace
+
+from checkpoint_test_base import R, CheckpointBaseTest
+from checkpoint_slave import square_with_pid
+
+
+@checkpoint
+def adding(a, b):
+    R()
+    return a + b
+
+
+class TraceTest(CheckpointBaseTest):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        stop_trace()
+        shutil.rmtree(self.tmp_dir)
+        super().tearDown()
+
+    def test_jsonl(self):
+        path = os.path.join(self.tmp_dir, "trace.jsonl")
+        start_trace(path, format="jsonl")
+        adding(1, 2)
+        adding(1, 2)
+        stop_trace()
+        self.runned()
+
+        with open(path) as f:
+            events = [json.loads(line) for line in f]
+
+        self.assertEqual(
+            [e["name"] for e in events], ["fingerprint", "compute", "dump", "fingerprint", "load"]
+        )
+        for e in events:
+            self.assertEqual(e["ph"], "X")
+            self.assertEqual(e["pid"], os.getpid())
+            self.assertEqual(e["args"]["name"], f"{__name__}.adding")
+            self.assertEqual(e["args"]["key"], events[0]["args"]["key"])
+        self.assertGreater(events[2]["args"]["size"], 0)
+
+        adding(1, 2)
+        with open(path) as f:
+            self.assertEqual(len(f.readlines()), 5)
+
+    def test_chrome(self):
+        path = os.path.join(self.tmp_dir, "trace.json")
+        start_trace(path)
+        adding(3, 4)
+        stop_trace()
+        self.runned()
+
+        with open(path) as f:
+            content = f.read()
+        self.assertTrue(content.startswith("["))
+        events = json.loads(content.rstrip().rstrip(",") + "]")
+        self.assertEqual(len(events), 3)
+
+    def test_multi_process(self):
+        path = os.path.join(self.tmp_dir, "trace.jsonl")
+        start_trace(path, format="jsonl")
+        square_with_pid.map([1, 2, 3], executor="process", max_workers=2)
+        stop_trace()
+
+        with open(path) as f:
+            events = [json.loads(line) for line in f]
+        pids = {e["pid"] for e in events if e["name"] == "compute"}
+        self.assertNotIn(os.getpid(), pids)
+        self.assertEqual(len([e for e in events if e["name"] == "dump"]), 3)
+
+    def test_wrong_format(self):
+        with self.assertRaises(ValueError):
+            start_trace(os.path.join(self.tmp_dir, "trace.txt"), format="txt")
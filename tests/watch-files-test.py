@@ -0,0 +1,188 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import Lutil.checkpoints._files as files
+from Lutil.checkpoints import checkpoint, InlineCheckpoint, FilePath
+
+from checkpoint_test_base import R, CheckpointBaseTest
+
+tmp_dir = None
+
+
+def path_of(name):
+    return os.path.join(tmp_dir, name)
+
+
+def write(name, content):
+    with open(path_of(name), "w") as f:
+        f.write(content)
+
+
+def read(path):
+    R()
+    with open(path) as f:
+        return f.read()
+
+
+class Foo(object):
+    pass
+
+
+def inline_read(path):
+    f = Foo()
+    with InlineCheckpoint(watch=[], produce=["f.content"], watch_files=[path]):
+        R()
+        with open(path) as file:
+            f.content = file.read()
+    return f.content
+
+
+def inline_read_variable(path):
+    f = Foo()
+    paths = [path]
+    with InlineCheckpoint(watch=[], produce=["f.variable_content"], watch_files=paths):
+        R()
+        with open(path) as file:
+            f.variable_content = file.read()
+    return f.variable_content
+
+
+def inline_read_call(name):
+    f = Foo()
+    with InlineCheckpoint(watch=[], produce=["f.call_content"], watch_files=[os.path.join(tmp_dir, name)]):
+        R()
+        with open(path_of(name)) as file:
+            f.call_content = file.read()
+    return f.call_content
+
+
+class WatchFilesTest(CheckpointBaseTest):
+    def setUp(self):
+        global tmp_dir
+        super().setUp()
+        tmp_dir = tempfile.mkdtemp()
+        files._file_hashes = None
+        write("a.txt", "a")
+
+    def tearDown(self):
+        shutil.rmtree(tmp_dir)
+        super().tearDown()
+
+    def test_watch_files(self):
+        @checkpoint(watch_files=[path_of("a.txt")])
+        def read_a():
+            return read(path_of("a.txt"))
+
+        self.assertEqual(read_a(), "a")
+        self.runned()
+        self.assertEqual(read_a(), "a")
+        self.not_runned()
+
+        write("a.txt", "b")
+        self.assertEqual(read_a(), "b")
+        self.runned()
+
+    def test_metadata_first(self):
+        @checkpoint(watch_files=[path_of("a.txt")])
+        def read_a():
+            return read(path_of("a.txt"))
+
+        with mock.patch.object(files, "_hash_file", wraps=files._hash_file) as hash_file:
+            read_a()
+            self.runned()
+            read_a()
+            self.not_runned()
+            self.assertEqual(hash_file.call_count, 1)
+
+            # Touched without changing the content
+            os.utime(path_of("a.txt"), ns=(0, 0))
+            read_a()
+            self.not_runned()
+            self.assertEqual(hash_file.call_count, 2)
+
+            # The hash values are saved for other processes
+            files._file_hashes = None
+            read_a()
+            self.not_runned()
+            self.assertEqual(hash_file.call_count, 2)
+
+    def test_table_compacted(self):
+        @checkpoint(watch_files=[path_of("a.txt")])
+        def read_a():
+            return read(path_of("a.txt"))
+
+        for i in range(5):
+            os.utime(path_of("a.txt"), ns=(i, i))
+            read_a()
+
+        with open(files._get_table_path()) as f:
+            paths = [json.loads(line)["path"] for line in f]
+        self.assertEqual(paths.count(os.path.abspath(path_of("a.txt"))), 1)
+
+    def test_file_path(self):
+        cached_read = checkpoint(read)
+        write("b.txt", "a")
+
+        self.assertEqual(cached_read(FilePath(path_of("a.txt"))), "a")
+        self.runned()
+        self.assertEqual(cached_read(FilePath(path_of("b.txt"))), "a")
+        self.not_runned()
+
+        write("a.txt", "c")
+        self.assertEqual(cached_read(FilePath(path_of("a.txt"))), "c")
+        self.runned()
+
+        self.assertEqual(cached_read(path_of("a.txt")), "c")
+        self.runned()
+
+    def test_missing_file(self):
+        @checkpoint(watch_files=[path_of("missing.txt")])
+        def const():
+            R()
+            return 1
+
+        const()
+        self.runned()
+        const()
+        self.not_runned()
+
+        write("missing.txt", "")
+        const()
+        self.runned()
+
+    def test_inline(self):
+        self.assertEqual(inline_read(path_of("a.txt")), "a")
+        self.runned()
+        self.assertEqual(inline_read(path_of("a.txt")), "a")
+        self.not_runned()
+
+        write("a.txt", "b")
+        self.assertEqual(inline_read(path_of("a.txt")), "b")
+        self.runned()
+
+    def test_inline_variable(self):
+        self.assertEqual(inline_read_variable(path_of("a.txt")), "a")
+        self.runned()
+        self.assertEqual(inline_read_variable(path_of("a.txt")), "a")
+        self.not_runned()
+
+        write("a.txt", "b")
+        self.assertEqual(inline_read_variable(path_of("a.txt")), "b")
+        self.runned()
+
+    def test_inline_call(self):
+        self.assertEqual(inline_read_call("a.txt"), "a")
+        self.runned()
+        self.assertEqual(inline_read_call("a.txt"), "a")
+        self.not_runned()
+
+        write("a.txt", "b")
+        self.assertEqual(inline_read_call("a.txt"), "b")
+        self.runned()
+
+    def test_invalid(self):
+        with self.assertRaises(TypeError):
+            checkpoint(watch_files="a.txt")